@@ -5,61 +5,92 @@ Run this before committing to verify no sensitive data will be pushed
 """
 
 import os
+import re
 import subprocess
 import sys
-from pathlib import Path
+
+# Same names as the globs .env, .env.*, *.env, api_keys.*, secrets.*, credentials.*,
+# *password*, *token* and *key*, folded into one pattern
+_SENSITIVE_NAME = re.compile(
+    r'^\.env\.|\.env$|^(?:api_keys|secrets|credentials)\.|password|token|key',
+    re.IGNORECASE
+)
+
+# Entries that must appear in .gitignore
+GITIGNORE_REQUIRED = ['.env']
+
+# Path fragments that mark a staged or untracked file as dangerous
+_DANGER_NAME = re.compile(r'\.env|secret|key|password', re.IGNORECASE)
+
+_SENSITIVE_CONTENT = re.compile(
+    rb'api_key|secret|password|token|credentials|POLYGON_API_KEY|AWS_ACCESS_KEY|AWS_SECRET|BUCKET_NAME|SNS_TOPIC_ARN',
+    re.IGNORECASE
+)
+_CONTENT_CHUNK_SIZE = 1 << 20
+_CONTENT_CHUNK_OVERLAP = 32  # Longer than any keyword above
 
 def check_env_files():
     """Check for environment files that should be ignored"""
-    env_patterns = [
-        '.env', '.env.*', '*.env', 
-        'api_keys.*', 'secrets.*', 'credentials.*',
-        '*password*', '*token*', '*key*'
-    ]
-    
-    found_files = []
-    for pattern in env_patterns:
-        for file_path in Path('.').glob(pattern):
-            if file_path.is_file():
-                found_files.append(str(file_path))
-    
-    return found_files
+    with os.scandir('.') as entries:
+        return [
+            entry.name for entry in entries
+            if entry.is_file() and _SENSITIVE_NAME.search(entry.name)
+        ]
 
 def check_git_status():
     """Check what files git would commit"""
     try:
-        # Get staged files
-        result = subprocess.run(['git', 'diff', '--cached', '--name-only'], 
+        # Get staged and untracked files from a single git process
+        result = subprocess.run(['git', '--no-optional-locks', 'status', '--porcelain=v1', '-z',
+                                 '--untracked-files=all'],
                               capture_output=True, text=True, check=True)
-        staged_files = result.stdout.strip().split('\n') if result.stdout.strip() else []
-        
-        # Get untracked files
-        result = subprocess.run(['git', 'ls-files', '--others', '--exclude-standard'], 
-                              capture_output=True, text=True, check=True)
-        untracked_files = result.stdout.strip().split('\n') if result.stdout.strip() else []
-        
-        return staged_files, untracked_files
     except subprocess.CalledProcessError:
         return [], []
+    
+    staged_files = []
+    untracked_files = []
+    entries = iter(result.stdout.split('\0'))
+    for entry in entries:
+        if not entry:
+            continue
+        status, path = entry[:2], entry[3:]
+        if status == '??':
+            untracked_files.append(path)
+        elif status[0] != ' ':
+            staged_files.append(path)
+        if status[0] in 'RC':
+            next(entries, None)  # Skip the original path of a rename/copy
+    
+    return staged_files, untracked_files
 
 def check_sensitive_content(file_path):
     """Check if file contains sensitive content"""
-    sensitive_keywords = [
-        'api_key', 'secret', 'password', 'token', 'credentials',
-        'POLYGON_API_KEY', 'AWS_ACCESS_KEY', 'AWS_SECRET',
-        'BUCKET_NAME', 'SNS_TOPIC_ARN'
-    ]
-    
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read().lower()
-            for keyword in sensitive_keywords:
-                if keyword.lower() in content:
+        with open(file_path, 'rb') as f:
+            # Read in chunks, carrying a short tail so keywords split across chunks still match
+            tail = b''
+            while True:
+                chunk = f.read(_CONTENT_CHUNK_SIZE)
+                if not chunk:
+                    return False
+                if _SENSITIVE_CONTENT.search(tail + chunk):
                     return True
-    except Exception:
-        pass
-    
-    return False
+                tail = chunk[-_CONTENT_CHUNK_OVERLAP:]
+    except OSError:
+        return False
+
+def list_present_files(paths):
+    """Return the subset of paths that exist as files, scanning each parent directory once"""
+    present = set()
+    for directory in {os.path.dirname(path) for path in paths}:
+        try:
+            with os.scandir(directory or '.') as entries:
+                present.update(
+                    os.path.join(directory, entry.name) for entry in entries if entry.is_file()
+                )
+        except OSError:
+            continue
+    return present
 
 def main():
     print("🔍 Git Safety Check - Protecting Your Secrets")
@@ -79,21 +110,23 @@ def main():
     
     # Check git status
     staged_files, untracked_files = check_git_status()
+    present = list_present_files(staged_files + untracked_files)
     
     # Check staged files for sensitive content
     dangerous_staged = []
     for file in staged_files:
-        if file and os.path.exists(file):
-            if any(pattern in file.lower() for pattern in ['.env', 'secret', 'key', 'password']):
-                dangerous_staged.append(file)
-            elif check_sensitive_content(file):
-                dangerous_staged.append(file)
+        # The cheap filename test short-circuits the content scan
+        if file in present and (
+            _DANGER_NAME.search(file) is not None
+            or check_sensitive_content(file)
+        ):
+            dangerous_staged.append(file)
     
     # Check untracked files
     dangerous_untracked = []
     for file in untracked_files:
-        if file and os.path.exists(file):
-            if any(pattern in file.lower() for pattern in ['.env', 'secret', 'key', 'password']):
+        if file in present:
+            if _DANGER_NAME.search(file) is not None:
                 dangerous_untracked.append(file)
     
     # Report results
@@ -122,13 +155,14 @@ def main():
         print(f"💡 Create a .gitignore file to protect sensitive files")
         return False
     
-    # Check if .env is in .gitignore
-    with open('.gitignore', 'r') as f:
+    # Check that every required entry is in .gitignore, reading the file once
+    with open('.gitignore', 'rb') as f:
         gitignore_content = f.read()
     
-    if '.env' not in gitignore_content:
-        print(f"\n⚠️  .env not found in .gitignore!")
-        print(f"💡 Add '.env' to your .gitignore file")
+    missing = [entry for entry in GITIGNORE_REQUIRED if entry.encode() not in gitignore_content]
+    if missing:
+        print(f"\n⚠️  {', '.join(missing)} not found in .gitignore!")
+        print(f"💡 Add {', '.join(repr(entry) for entry in missing)} to your .gitignore file")
         return False
     
     if dangerous_staged:
@@ -1,42 +1,96 @@
-from firecrawl import FirecrawlApp
 import re
-from io import StringIO
+from io import BytesIO, TextIOWrapper
 from datetime import datetime
 import json
 import boto3
 import csv
 import os
 import requests
-from polygon import RESTClient
-from polygon.rest.models import TickerSnapshot
+from requests.adapters import HTTPAdapter
 import asyncio
 from firecrawl import AsyncFirecrawlApp
 
+# Use orjson for response bodies when it is packaged with the lambda
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj).decode('utf-8')
+except ImportError:
+    _dumps = json.dumps
+
 # Remove hardcoded API keys and load from environment variables
 FIRECRAWL_API_KEY = os.getenv('FIRECRAWL_API_KEY')
 POLYGON_API_KEY = os.getenv('POLYGON_API_KEY')
 
-def scrape(event):
+# AWS clients by service name, created on first use and reused across warm invocations.
+# Nothing is cached when creation fails, so the next invocation retries it.
+_AWS_CLIENTS = {}
+
+def _aws_client(service, **kwargs):
+    """Return the boto3 client for service, creating it on first use"""
+    client = _AWS_CLIENTS.get(service)
+    if client is None:
+        client = _AWS_CLIENTS[service] = boto3.client(service, **kwargs)
+    return client
+
+# Pooled keep-alive session for direct Polygon REST calls
+POLYGON_GAINERS_URL = 'https://api.polygon.io/v2/snapshot/locale/us/markets/stocks/gainers'
+_HTTP = requests.Session()
+_HTTP.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8))
+_FIRECRAWL = None
+
+# Regular expressions used by the scrapers, compiled once at import
+_TV_RE = re.compile(r'\[([A-Z]+)\]\(/symbols/[A-Z-]+/.*?"([^"]+)"\)')
+_TIP_RE = re.compile(r'\| \[([A-Z]+)\][^<]*<br>([^|]+)')
+_INVESTING_TABLE_RE = re.compile(r"## Pre Market Top Gainers\n\n(\| Name \| Price \|[^\n]*\n\| --- \| --- \|[^\n]*\n(?:\| .+\n)+)")
+_INVESTING_LINE_RE = re.compile(r'\|\s*\[(.*?)<br><br>(.*?)\]\([^)]*\)\s*\|')
+_INVESTING_LOSERS_TABLE_RE = re.compile(r"## Pre Market Top Losers\n\n(\| Name \| Price \|\n\| --- \| --- \|\n(?:\| .+\n)+)")
+_INVESTING_ROW_RE = re.compile(r'\|\s*\[(.*?)\\<br>\\<br>(.*?)\]\((.*?)\)\s*\|\s*([\d.]+)\+([\d.]+)\+([\d.]+%)\s*\|')
+_INVESTING_LOSER_ROW_RE = re.compile(r'\|\s*\[(.*?)\\<br>\\<br>(.*?)\]\([^)]*\)\s*\|\s*([^|\n]+)\s*\|')
+# One table row: symbol link in the first cell, company name link in the second
+_NASDAQ_ROW_RE = re.compile(
+    r'^(?![^\n]*---)[^|\n]*\|[^|\n]*?\[([A-Z]+)\][^|\n]*\|[^|\n]*?\[([^]|\n]+)\][^|\n]*\|',
+    re.MULTILINE
+)
+_TICKER_RE = re.compile(r"\[([A-Z]+)\+")
+
+async def scrape_async(event):
     """
     Main scraping function that coordinates all data sources.
+    Sources are scraped concurrently, so total wall time is bounded by the slowest source.
     """
-    app = FirecrawlApp(api_key=FIRECRAWL_API_KEY)
+    app = get_firecrawl_app()
     extracted_data = []
 
     sources = {
         "investing": scrape_investing,
         # "nasdaq": scrape_nasdaq_most_advanced,
         # "tip_ranks": scrape_tip_ranks,
-        "polygon": lambda app: polygon_top_gainers_api(POLYGON_API_KEY)
+        "polygon": lambda app: asyncio.to_thread(polygon_top_gainers_api, POLYGON_API_KEY)
     }
 
     source = event.get('source', 'combine')
 
     if source == 'combine':
-        for scraper in sources.values():
-            extracted_data.extend(scraper(app))
+        scrapers = list(sources.items())
     elif source in sources:
-        extracted_data.extend(sources[source](app))
+        scrapers = [(source, sources[source])]
+    else:
+        scrapers = []
+
+    results = await asyncio.gather(*[scraper(app) for _, scraper in scrapers], return_exceptions=True)
+    # Remove duplicates by ticker+source as rows are collected
+    seen = set()
+    for (name, _), result in zip(scrapers, results):
+        if isinstance(result, Exception):
+            print(f"Error scraping {name}: {str(result)}")
+            continue
+        for row in result:
+            key = (row[0], row[2])
+            if key not in seen:
+                seen.add(key)
+                extracted_data.append(row)
 
     if not extracted_data:
         print("No data extracted from any source.")
@@ -45,23 +99,31 @@ def scrape(event):
     print(f"Total stocks extracted: {len(extracted_data)}")
     return extracted_data
 
+def get_firecrawl_app():
+    """
+    Returns the AsyncFirecrawlApp shared by all scrapers, created on first use and kept for warm invocations.
+    """
+    global _FIRECRAWL
+    if _FIRECRAWL is None:
+        _FIRECRAWL = AsyncFirecrawlApp(api_key=FIRECRAWL_API_KEY)
+    return _FIRECRAWL
+
 def get_scrape_params():
     return {
         'formats': ['markdown'],
         'waitFor': 5000
     }
 
-def scrape_trading_view(app):
+async def scrape_trading_view(app):
     """
     Scrapes data from TradingView pre-market gainers page and extracts ticker symbols and company names.
     """
     trading_view_url = "https://www.tradingview.com/markets/stocks-usa/market-movers-pre-market-gainers/"
-    data = app.scrape_url(trading_view_url, **get_scrape_params())
+    data = await app.scrape_url(trading_view_url, **get_scrape_params())
     markdown_text = data.markdown
     
-    # Regular expression to extract ticker symbols and names
-    pattern = r'\[([A-Z]+)\]\(/symbols/[A-Z-]+/.*?"([^"]+)"\)'
-    matches = re.findall(pattern, markdown_text)
+    # Extract ticker symbols and names
+    matches = _TV_RE.findall(markdown_text)
     
     cleaned_data = []
     for symbol, name in matches:
@@ -74,17 +136,16 @@ def scrape_trading_view(app):
     else:
         return log_not_found("TradingView")
 
-def scrape_tip_ranks(app):
+async def scrape_tip_ranks(app):
     """
     Scrapes data from TipRanks pre-market gainers page and extracts ticker symbols and company names.
     """           
     tip_rank_url = "https://www.tipranks.com/screener/pre-market-gainers"
-    data = app.scrape_url(tip_rank_url, **get_scrape_params())
+    data = await app.scrape_url(tip_rank_url, **get_scrape_params())
     markdown_text = data.markdown 
     
     # Parse the markdown table directly
-    pattern = r'\| \[([A-Z]+)\][^<]*<br>([^|]+)'
-    matches = re.findall(pattern, markdown_text)
+    matches = _TIP_RE.findall(markdown_text)
     
     cleaned_data = []
     for symbol, name in matches:
@@ -100,51 +161,42 @@ def scrape_tip_ranks(app):
     print("No data found in TipRanks scraping")
     return []
 
-def scrape_investing(app=None):
+async def scrape_investing(app):
     """
     Scrapes data from Investing.com pre-market gainers page using AsyncFirecrawlApp.
     """
-    async def async_scrape():
-        async_app = AsyncFirecrawlApp(api_key=FIRECRAWL_API_KEY)
-        response = await async_app.scrape_url(
-            url='https://www.investing.com/equities/pre-market',
-            formats=['markdown'],
-            only_main_content=True
-        )
-        return response.markdown
-
-    markdown_text = asyncio.run(async_scrape())
+    response = await app.scrape_url(
+        url='https://www.investing.com/equities/pre-market',
+        formats=['markdown'],
+        only_main_content=True
+    )
+    markdown_text = response.markdown
     # Parse the markdown for the pre-market top gainers table
-    pattern = r"## Pre Market Top Gainers\n\n(\| Name \| Price \|[^\n]*\n\| --- \| --- \|[^\n]*\n(?:\| .+\n)+)"
-    match = re.search(pattern, markdown_text)
+    match = _INVESTING_TABLE_RE.search(markdown_text)
     if match:
         pre_market_top_gainers_table = match.group(1)
-        lines = pre_market_top_gainers_table.strip().split('\n')[2:]  # Skip headers
         cleaned_data = []
-        for line in lines:
-            # Try to extract symbol and name from the line
-            # Example: | [AAPL]<br><br>Apple Inc. | 123.45 |
-            match = re.search(r'\|\s*\[(.*?)<br><br>(.*?)\]\([^)]*\)\s*\|', line)
-            if match:
-                symbol = match.group(1).strip()
-                name = match.group(2).strip()
-                if symbol and name:
-                    cleaned_data.append([symbol, name, "investing gainers"])
+        # Header rows never match, so scan the table in one pass instead of splitting it into lines
+        # Example: | [AAPL]<br><br>Apple Inc. | 123.45 |
+        for row in _INVESTING_LINE_RE.finditer(pre_market_top_gainers_table):
+            symbol = row.group(1).strip()
+            name = row.group(2).strip()
+            if symbol and name:
+                cleaned_data.append([symbol, name, "investing gainers"])
         if cleaned_data:
             print(f"Successfully extracted {len(cleaned_data)} stocks from Investing.com")
             return cleaned_data
     print("No data found for Investing.com")
     return []
 
-def scrape_investing_losers(app):
+async def scrape_investing_losers(app):
     investing_url = "https://www.investing.com/equities/pre-market"
-    data = app.scrape_url(investing_url, **get_scrape_params())
+    data = await app.scrape_url(investing_url, **get_scrape_params())
     markdown_text = data.markdown
-    pattern = r"## Pre Market Top Losers\n\n(\| Name \| Price \|\n\| --- \| --- \|\n(?:\| .+\n)+)"
-    match = re.search(pattern, markdown_text)
+    match = _INVESTING_LOSERS_TABLE_RE.search(markdown_text)
     return parse_investing_losers_data(match) if match else log_not_found("Investing.com")
 
-def scrape_nasdaq_most_advanced(app):
+async def scrape_nasdaq_most_advanced(app):
     """
     Scrapes the Most Advanced table from NASDAQ's pre-market page using Firecrawl.
     Returns a list of [symbol, name] entries.
@@ -174,29 +226,16 @@ def scrape_nasdaq_most_advanced(app):
     
     try:
         print("Starting NASDAQ scrape...")
-        data = app.scrape_url(url, **params)
+        data = await app.scrape_url(url, **params)
         markdown_text = data.markdown
         
         # Process the table data
+        # Header/separator rows never match the row pattern
         cleaned_data = []
-        lines = markdown_text.split('\n')
-        
-        for line in lines:
-            if '|' not in line or '---' in line:  # Skip header/separator rows
-                continue
-                
-            cells = [cell.strip() for cell in line.split('|')]
-            if len(cells) > 3:  # Ensure we have enough cells
-                # Extract symbol from cell 1
-                symbol_match = re.search(r'\[([A-Z]+)\]', cells[1])
-                # Extract name from cell 2
-                name_match = re.search(r'\[([^]]+)\]', cells[2])
-                
-                if symbol_match and name_match:
-                    symbol = symbol_match.group(1)
-                    name = name_match.group(1)
-                    print(f"Found NASDAQ stock: {symbol} - {name}")
-                    cleaned_data.append([symbol, name, "nasdaq"])
+        for match in _NASDAQ_ROW_RE.finditer(markdown_text):
+            symbol, name = match.group(1), match.group(2)
+            print(f"Found NASDAQ stock: {symbol} - {name}")
+            cleaned_data.append([symbol, name, "nasdaq"])
         
         if cleaned_data:
             print(f"Successfully extracted {len(cleaned_data)} stocks from NASDAQ")
@@ -210,35 +249,26 @@ def scrape_nasdaq_most_advanced(app):
         return []
 
 def parse_investing_data(match):
+    # The row pattern only matches data rows, so header rows are skipped without splitting
     pre_market_top_gainers_table = match.group(0)
-    lines = pre_market_top_gainers_table.strip().split('\n')[3:]
     return [
-        [match.group(1), match.group(2), "investing gainers"]
-        for line in lines
-        if (match := re.search(r'\|\s*\[(.*?)\\<br>\\<br>(.*?)\]\((.*?)\)\s*\|\s*([\d.]+)\+([\d.]+)\+([\d.]+%)\s*\|', line))
+        [row.group(1), row.group(2), "investing gainers"]
+        for row in _INVESTING_ROW_RE.finditer(pre_market_top_gainers_table)
     ]
 
 def parse_investing_losers_data(match):
+    # Updated regex to handle escaped characters; header rows never match it
     pre_market_top_losers_table = match.group(0)
-    lines = pre_market_top_losers_table.strip().split('\n')
-    parse_data = []
-   
-    for line in lines[2:]:  # Start from index 2 to skip header rows
-        # Updated regex to handle escaped characters
-        match = re.search(r'\|\s*\[(.*?)\\<br>\\<br>(.*?)\]\([^)]*\)\s*\|\s*([^|]+)\s*\|', line)
-        if match:
-            symbol = match.group(1).strip()
-            company = match.group(2).strip()
-            price_change = match.group(3).strip()
-            parse_data.append([symbol, company, "investing losers"])
-    return parse_data
+    return [
+        [row.group(1).strip(), row.group(2).strip(), "investing losers"]
+        for row in _INVESTING_LOSER_ROW_RE.finditer(pre_market_top_losers_table)
+    ]
 
 def extract_stock_tickers(markdown_text):
     """
     Extracts stock tickers from the given markdown text using regular expressions.
     """
-    ticker_pattern = r"\[([A-Z]+)\+"  # Pattern to match tickers in the markdown text
-    tickers = re.findall(ticker_pattern, markdown_text)
+    tickers = _TICKER_RE.findall(markdown_text)
     return list(set(tickers))  # Remove duplicates if necessary
 
 def log_not_found(source):
@@ -256,26 +286,20 @@ def save_csv_to_file(csv_data, event):
         csv_writer.writerow(['ticker', 'Name', 'Source'])
         csv_writer.writerows(csv_data)
 
-def send_sns_notification(message, source, bucket_name, file_name):
-    s3 = boto3.client('s3')  # Initialize s3 client
-    presigned_url = s3.generate_presigned_url(
-        'get_object',
-        Params={
-            'Bucket': bucket_name,
-            'Key': file_name
-        },
-        ExpiresIn=604800  # 7 days in seconds
-    )
-    sns = boto3.client('sns')
+def send_sns_notification(presigned_url, source, record_count):
     topic_arn = os.getenv('SNS_TOPIC_ARN')
-    sns.publish(
+    message = (
+        f"Pre-market top gainers scraped from source: {source}\n"
+        f"Records saved: {record_count}\n\n"
+        f"Download link (expires in 7 days): {presigned_url}"
+    )
+    _aws_client('sns').publish(
         TopicArn=topic_arn,
-        Message=f"{message}\n\nDownload link: {presigned_url}",
+        Message=message,
         Subject="Pre-Market Top Gainers CSV"
     )
 
 def handle_exception(e):
-    sns = boto3.client('sns')
     topic_arn = os.getenv('SNS_TOPIC_ARN')
     error_message = f"Error in pre-market scraper lambda: {str(e)}"
     print(error_message)
@@ -284,7 +308,7 @@ def handle_exception(e):
 def create_response(status_code, message):
     return {
         'statusCode': status_code,
-        'body': json.dumps(message)
+        'body': _dumps(message)
     }
 
 def save_to_s3(data, event):
@@ -297,41 +321,47 @@ def save_to_s3(data, event):
         
     print(f"Preparing to save {len(data)} records to S3...")
     
-    s3 = boto3.client('s3', region_name='us-east-1')
     bucket_name = 'hamiltonai.com'
     date = datetime.now().strftime('%Y%m%d')
     file_name = f'stock_data/{date}/stock_data_{date}.csv'
     
-    # Create CSV content with proper line endings
-    csv_content = convert_to_csv(data)
-    print(f"CSV content created, size: {len(csv_content)}")
+    # Write UTF-8 CSV bytes straight into the upload buffer
+    buf = BytesIO()
+    stream_csv(data, buf)
+    print(f"CSV content created, size: {buf.tell()}")
+    buf.seek(0)
     
     try:
-        s3.put_object(
-            Bucket=bucket_name,
-            Key=file_name,
-            Body=csv_content.encode('utf-8')  # Explicitly encode as UTF-8
-        )
+        s3 = _aws_client('s3', region_name='us-east-1')
+        s3.upload_fileobj(buf, bucket_name, file_name)
         print(f"Successfully saved to S3: s3://{bucket_name}/{file_name}")
         
         # Send notification only if we actually saved data
         if data:
-            send_sns_notification(csv_content, event.get('source', 'unknown'), bucket_name, file_name)
+            presigned_url = s3.generate_presigned_url(
+                'get_object',
+                Params={
+                    'Bucket': bucket_name,
+                    'Key': file_name
+                },
+                ExpiresIn=604800  # 7 days in seconds
+            )
+            send_sns_notification(presigned_url, event.get('source', 'unknown'), len(data))
             
         return bucket_name, file_name
     except Exception as e:
         print(f"Error saving to S3: {str(e)}")
         raise
 
-def convert_to_csv(data):
+def stream_csv(data, buf):
     """
-    Converts the data to CSV format with proper line endings.
+    Writes the data as UTF-8 encoded CSV with proper line endings into a binary buffer.
     """
-    output = StringIO()
+    output = TextIOWrapper(buf, encoding='utf-8', newline='', write_through=True)
     writer = csv.writer(output, lineterminator='\n')  # Explicitly set line ending
     writer.writerow(['ticker', 'name', 'source'])  # Header
     writer.writerows(data)
-    return output.getvalue()
+    output.detach()  # Leave buf open for the caller
 
 def polygon_top_gainers_api(api_key):
     """
@@ -342,15 +372,14 @@ def polygon_top_gainers_api(api_key):
         print("POLYGON_API_KEY environment variable not set.")
         return []
     try:
-        client = RESTClient(api_key)
-        tickers = client.get_snapshot_direction("stocks", direction="gainers")
-        cleaned_data = []
-        for item in tickers:
-            if isinstance(item, TickerSnapshot):
-                ticker = item.ticker
-                name = getattr(item, 'name', None) or ''
-                if ticker:
-                    cleaned_data.append([ticker, name, 'polygon'])
+        # Only ticker and name are needed, so parse the raw JSON instead of building SDK models
+        response = _HTTP.get(POLYGON_GAINERS_URL, params={'apiKey': api_key}, timeout=10)
+        response.raise_for_status()
+        cleaned_data = [
+            [t['ticker'], t.get('name') or '', 'polygon']
+            for t in response.json().get('tickers', [])
+            if t.get('ticker')
+        ]
         print(f"Successfully extracted {len(cleaned_data)} stocks from Polygon.io")
         return cleaned_data
     except Exception as e:
@@ -363,7 +392,7 @@ def lambda_handler(event, context):
     """
     try:
         print("Starting lambda handler...")
-        data = scrape(event)
+        data = asyncio.run(scrape_async(event))
         
         if not data:
             print("No data was scraped")
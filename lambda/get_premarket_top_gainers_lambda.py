@@ -6,7 +6,6 @@ Requirements:
 - aiohttp
 - polygon-api-client (or your RESTClient)
 - python-dotenv (optional, for local testing)
-- pytz
 
 Environment variables required:
 - POLYGON_API_KEY
@@ -17,35 +16,62 @@ If date_str is not provided in the event, the current date (America/Chicago, YYY
 """
 import os
 import csv
+from io import BytesIO, TextIOWrapper
+from concurrent.futures import ThreadPoolExecutor
 from polygon import RESTClient
 from datetime import datetime
-import pytz
+from zoneinfo import ZoneInfo
 import boto3
 from firecrawl import FirecrawlApp
 import re
 
+# Environment and timezone are resolved once per container
+POLYGON_API_KEY = os.environ.get('POLYGON_API_KEY')
+FIRECRAWL_API_KEY = os.environ.get('FIRECRAWL_API_KEY')
+BUCKET_NAME = os.environ.get('BUCKET_NAME')
+SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN')
+CST = ZoneInfo('America/Chicago')
+
+# AWS clients by service name, created on first use and reused across warm invocations.
+# Nothing is cached when creation fails, so the next invocation retries it.
+_AWS_CLIENTS = {}
+
+def _aws_client(service, **kwargs):
+    """Return the boto3 client for service, creating it on first use"""
+    client = _AWS_CLIENTS.get(service)
+    if client is None:
+        client = _AWS_CLIENTS[service] = boto3.client(service, **kwargs)
+    return client
+
+_POLYGON_CLIENT = None
+
+# Regular expressions for the Investing.com scrape, compiled once at import
+_INVESTING_TABLE_RE = re.compile(r"## Pre Market Top Gainers\n\n(\| Name \| Price \|\n\| --- \| --- \|\n(?:\| .+\n)+)")
+_INVESTING_LINE_RE = re.compile(r'\|\s*\[(.*?)\<br>\<br>(.*?)\]\((.*?)\)\s*\|')
+
 def polygon_top_gainers():
-    api_key = os.environ.get('POLYGON_API_KEY')
+    api_key = POLYGON_API_KEY
     if not api_key:
         print('POLYGON_API_KEY not set in environment')
         return []
-    client = RESTClient(api_key)
+    global _POLYGON_CLIENT
+    if _POLYGON_CLIENT is None:
+        _POLYGON_CLIENT = RESTClient(api_key)  # Keeps its HTTP connection pool across invocations
+    client = _POLYGON_CLIENT
     try:
         gainers = client.get_snapshot_direction("stocks", "gainers")
     except Exception as e:
         print(f"Error fetching premarket top gainers from Polygon: {e}")
         return []
-    results = []
-    for g in gainers:
-        ticker = getattr(g, "ticker", None)
-        # Polygon snapshot objects may not have a 'name' field; fallback to ticker if not present
-        name = getattr(g, "name", None) or ticker
-        if ticker:
-            results.append([ticker, name, "polygon"])
-    return results
+    # Polygon snapshot objects may not have a 'name' field; fallback to ticker if not present
+    return [
+        [g.ticker, getattr(g, "name", None) or g.ticker, "polygon"]
+        for g in gainers
+        if getattr(g, "ticker", None)
+    ]
 
 def firecrawl_investing():
-    api_key = os.getenv('FIRECRAWL_API_KEY')
+    api_key = FIRECRAWL_API_KEY
     if not api_key:
         print('FIRECRAWL_API_KEY not set in environment')
         return []
@@ -55,14 +81,13 @@ def firecrawl_investing():
     try:
         data = app.scrape_url(investing_url, params=params)
         markdown_text = data['markdown']
-        pattern = r"## Pre Market Top Gainers\n\n(\| Name \| Price \|\n\| --- \| --- \|\n(?:\| .+\n)+)"
-        match = re.search(pattern, markdown_text)
+        match = _INVESTING_TABLE_RE.search(markdown_text)
         if match:
             pre_market_top_gainers_table = match.group(0)
             lines = pre_market_top_gainers_table.strip().split('\n')[3:]  # Skip headers
             cleaned_data = []
             for line in lines:
-                match = re.search(r'\|\s*\[(.*?)\<br>\<br>(.*?)\]\((.*?)\)\s*\|', line)
+                match = _INVESTING_LINE_RE.search(line)
                 if match:
                     symbol = match.group(1).strip()
                     name = match.group(2).strip()
@@ -75,24 +100,33 @@ def firecrawl_investing():
         print(f"Error scraping Investing.com: {e}")
         return []
 
+def fetch_result_or_empty(future, source):
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"Error fetching premarket top gainers from {source}: {e}")
+        return []
+
 def lambda_handler(event, context):
     try:
-        s3_bucket = os.environ.get('BUCKET_NAME')
-        sns_topic_arn = os.environ.get('SNS_TOPIC_ARN')
+        s3_bucket = BUCKET_NAME
+        sns_topic_arn = SNS_TOPIC_ARN
         # Use date_str from event if provided, else use current date in America/Chicago
         date_str = event.get('date_str')
         if not date_str:
-            cst = pytz.timezone('America/Chicago')
-            date_str = datetime.now(cst).strftime('%Y%m%d')
+            date_str = datetime.now(CST).strftime('%Y%m%d')
         if not s3_bucket:
             print('BUCKET_NAME not set in environment')
             return {'status': 'error', 'message': 'Missing BUCKET_NAME'}
         if not sns_topic_arn:
             print('SNS_TOPIC_ARN not set in environment')
             return {'status': 'error', 'message': 'Missing SNS_TOPIC_ARN'}
-        # Get data from both sources
-        investing_data = firecrawl_investing()
-        polygon_data = polygon_top_gainers()
+        # Get data from both sources concurrently; both calls are network-bound
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            investing_future = executor.submit(firecrawl_investing)
+            polygon_future = executor.submit(polygon_top_gainers)
+            investing_data = fetch_result_or_empty(investing_future, "Investing.com")
+            polygon_data = fetch_result_or_empty(polygon_future, "Polygon")
         all_data = investing_data + polygon_data
         # Remove duplicates by ticker+source (in case of overlap)
         seen = set()
@@ -102,20 +136,25 @@ def lambda_handler(event, context):
             if key not in seen:
                 unique_data.append(row)
                 seen.add(key)
-        # Write to CSV
+        # Write CSV into an in-memory buffer
         fieldnames = ["ticker", "name", "source"]
         filename = f"premarket_top_gainers_{date_str}.csv"
-        local_path = f"/tmp/{filename}"
-        with open(local_path, "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(fieldnames)
-            writer.writerows(unique_data)
-        print(f"Premarket top gainers written to {local_path}")
-        # Upload to S3
+        buf = BytesIO()
+        f = TextIOWrapper(buf, encoding="utf-8", newline="", write_through=True)
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows(unique_data)
+        f.detach()
+        csv_bytes = buf.getvalue()
+        if os.environ.get('DEBUG_LOCAL'):
+            local_path = f"/tmp/{filename}"
+            with open(local_path, "wb") as out:
+                out.write(csv_bytes)
+            print(f"Premarket top gainers written to {local_path}")
+        # Upload to S3 in a single request; the file is small enough not to need a managed transfer
         s3_key = f"stock_data/{date_str}/{filename}"
-        s3 = boto3.client('s3')
-        with open(local_path, "rb") as f:
-            s3.put_object(Bucket=s3_bucket, Key=s3_key, Body=f.read())
+        s3 = _aws_client('s3')
+        s3.put_object(Bucket=s3_bucket, Key=s3_key, Body=csv_bytes)
         print(f"Premarket top gainers uploaded to S3: {s3_key}")
         # Generate presigned URL
         presigned_url = s3.generate_presigned_url(
@@ -124,7 +163,7 @@ def lambda_handler(event, context):
             ExpiresIn=604800  # 7 days
         )
         # Send SNS notification
-        sns = boto3.client('sns')
+        sns = _aws_client('sns')
         message = (
             f'Premarket Top Gainers updated using Polygon.io and Investing.com.\n\n'
             f'Date: {date_str}\n'
@@ -148,8 +187,8 @@ def lambda_handler(event, context):
         print('Error in get_premarket_top_gainers_lambda:', str(e))
         # Send SNS error notification
         try:
-            sns = boto3.client('sns')
-            sns_topic_arn = os.environ.get('SNS_TOPIC_ARN')
+            sns = _aws_client('sns')
+            sns_topic_arn = SNS_TOPIC_ARN
             if sns_topic_arn:
                 error_message = f'Error updating premarket top gainers: {str(e)}'
                 sns.publish(
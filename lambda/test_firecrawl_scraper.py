@@ -0,0 +1,58 @@
+# test_firecrawl_scraper.py - Tests for the NASDAQ table parsing in the scraper Lambda (run with pytest)
+import asyncio
+import os
+import re
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("boto3")
+pytest.importorskip("requests")
+pytest.importorskip("firecrawl")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import firecrawl_scraper
+
+# Captured Most Advanced table, with a missing name cell and a dotted ticker
+NASDAQ_MARKDOWN = """## Most Advanced
+
+| Symbol | Name | Last Sale | Change |
+| --- | --- | --- | --- |
+| [ABCD](https://www.nasdaq.com/market-activity/stocks/abcd) | [Abcd Therapeutics, Inc.](https://www.nasdaq.com/market-activity/stocks/abcd) | $4.12 | +1.05 |
+| [XYZ](https://www.nasdaq.com/market-activity/stocks/xyz) |  | $2.30 | +0.80 |
+| [BRK.B](https://www.nasdaq.com/market-activity/stocks/brk.b) | [Berkshire Hathaway Inc.](https://www.nasdaq.com/market-activity/stocks/brk.b) | $410.00 | +9.10 |
+| [QRS](https://www.nasdaq.com/market-activity/stocks/qrs) | [Qrs Holdings Corp.](https://www.nasdaq.com/market-activity/stocks/qrs) | $1.01 | +0.33 |
+
+Data as of 08:45 AM ET
+"""
+
+
+def baseline_rows(markdown_text):
+    """Per-line parsing the row pattern replaced."""
+    rows = []
+    for line in markdown_text.split('\n'):
+        if '|' not in line or '---' in line:
+            continue
+        cells = [cell.strip() for cell in line.split('|')]
+        if len(cells) > 3:
+            symbol_match = re.search(r'\[([A-Z]+)\]', cells[1])
+            name_match = re.search(r'\[([^]]+)\]', cells[2])
+            if symbol_match and name_match:
+                rows.append([symbol_match.group(1), name_match.group(1), "nasdaq"])
+    return rows
+
+
+class FakeApp:
+    async def scrape_url(self, url, **params):
+        return SimpleNamespace(markdown=NASDAQ_MARKDOWN)
+
+
+def test_nasdaq_rows_match_baseline():
+    rows = asyncio.run(firecrawl_scraper.scrape_nasdaq_most_advanced(FakeApp()))
+
+    assert rows == [
+        ["ABCD", "Abcd Therapeutics, Inc.", "nasdaq"],
+        ["QRS", "Qrs Holdings Corp.", "nasdaq"],
+    ]
+    assert rows == baseline_rows(NASDAQ_MARKDOWN)
@@ -1,12 +1,52 @@
 import os
 import boto3
 import pandas as pd
+import numpy as np
 from datetime import datetime
-import pytz
+from zoneinfo import ZoneInfo
 from polygon import RESTClient
-from polygon.rest.models import TickerSnapshot
 import json
-from io import StringIO
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None  # Fall back to the daily CSV when pyarrow is not in the Lambda layer
+
+# The deployment package is read-only on Lambda, so numba's on-disk cache has to live under /tmp
+if os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
+    os.environ.setdefault("NUMBA_CACHE_DIR", "/tmp/numba_cache")
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        # numba is optional; without it the screening kernel runs as plain NumPy
+        return lambda func: func
+
+# Resolved once per container; zoneinfo avoids pytz's per-call transition lookups
+TIMEZONE = ZoneInfo(os.getenv("TIMEZONE", "America/Chicago"))
+
+# AWS clients by service name, created on first use and reused across warm invocations.
+# Nothing is cached when creation fails, so the next invocation retries it.
+_AWS_CLIENTS = {}
+
+def _aws_client(service, **kwargs):
+    """Return the boto3 client for service, creating it on first use"""
+    client = _AWS_CLIENTS.get(service)
+    if client is None:
+        client = _AWS_CLIENTS[service] = boto3.client(service, **kwargs)
+    return client
+
+_POLYGON_CLIENT = None
+
+# Snapshot requests in flight at once; the fetch phase is I/O-bound
+FETCH_WORKERS = 32
+
+# Field order of the tuples returned by fetch_stock_data
+SNAPSHOT_FIELDS = ("symbol", "open", "high", "low", "close", "volume", "prev_close", "market_cap", "avg_volume", "change_pct")
 
 def get_static_nasdaq_symbols():
     # Example static list; replace with your actual static list
@@ -21,6 +61,28 @@ def get_dynamic_nasdaq_symbols(client, limit=100):
             break
     return symbols
 
+def get_cached_nasdaq_symbols(s3, bucket_name, client, date_str, limit=100):
+    # The NASDAQ list is stable within a day, so only the first run of the day paginates Polygon
+    cache_key = f"cache/nasdaq_tickers/{date_str}.json"
+    try:
+        cache_obj = s3.get_object(Bucket=bucket_name, Key=cache_key)
+        cached = json.loads(cache_obj["Body"].read())
+        # A list cached by a run with a smaller limit cannot serve this one
+        if len(cached) >= limit:
+            return cached[:limit]
+    except s3.exceptions.NoSuchKey:
+        pass  # First run of the day
+    except Exception as e:
+        print(f"Error reading cached symbols: {e}")
+    symbols = get_dynamic_nasdaq_symbols(client, limit=limit)
+    # Only a full list is cached, so an empty or truncated fetch is not pinned for the rest of the day
+    if len(symbols) >= limit:
+        try:
+            s3.put_object(Bucket=bucket_name, Key=cache_key, Body=json.dumps(symbols))
+        except Exception as e:
+            print(f"Error caching symbols: {e}")
+    return symbols
+
 def fetch_stock_data(client, symbol):
     try:
         snapshot = client.get_snapshot_ticker(symbol)
@@ -37,88 +99,109 @@ def fetch_stock_data(client, symbol):
         if None in [open_price, high, low, close, volume, prev_close, market_cap, avg_volume]:
             return None
         change_pct = ((open_price - prev_close) / prev_close) * 100 if prev_close else None
-        return {
-            "symbol": symbol,
-            "open": open_price,
-            "high": high,
-            "low": low,
-            "close": close,
-            "volume": volume,
-            "prev_close": prev_close,
-            "market_cap": market_cap,
-            "avg_volume": avg_volume,
-            "change_pct": change_pct
-        }
+        # Same order as SNAPSHOT_FIELDS
+        return (symbol, open_price, high, low, close, volume, prev_close, market_cap, avg_volume, change_pct)
     except Exception as e:
         print(f"Error fetching data for {symbol}: {e}")
         return None
 
-def apply_screening_criteria(stock):
-    try:
-        return (
-            stock["volume"] > 300_000 and
-            stock["change_pct"] is not None and stock["change_pct"] >= 2.5 and
-            stock["prev_close"] >= 0.01 and
-            stock["open"] > stock["prev_close"]
-        )
-    except Exception:
-        return False
+@njit(cache=True)
+def apply_screening_criteria(volume, change_pct, prev_close, open_price):
+    # Vectorized over float64 columns; NaN change_pct never qualifies
+    return (
+        (volume > 300_000) &
+        (change_pct >= 2.5) &
+        (prev_close >= 0.01) &
+        (open_price > prev_close)
+    )
+
+def read_screening_results(s3, bucket_name, date_str):
+    # Union a day's per-timepoint snapshots, fetching the objects in parallel and concatenating once
+    prefix = f"stock_data/{date_str}/timepoint="
+    keys = [
+        obj["Key"]
+        for page in s3.get_paginator("list_objects_v2").paginate(Bucket=bucket_name, Prefix=prefix)
+        for obj in page.get("Contents", [])
+    ]
+    if not keys:
+        return pd.DataFrame()
+    if pq is None and any(key.endswith(".parquet") for key in keys):
+        raise RuntimeError(f"pyarrow is required to read the Parquet screening results under {prefix}")
+
+    def read_snapshot(key):
+        body = BytesIO(s3.get_object(Bucket=bucket_name, Key=key)["Body"].read())
+        if key.endswith(".parquet"):
+            return pq.read_table(body).to_pandas()
+        return pd.read_csv(body, compression="gzip")
+
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        frames = list(executor.map(read_snapshot, sorted(keys)))
+    return pd.concat(frames, ignore_index=True)
+
+# Compile (or load from cache) during container init rather than on the first invocation
+apply_screening_criteria(*(np.zeros(1) for _ in range(4)))
 
 def lambda_handler(event, context):
     POLYGON_API_KEY = os.getenv("POLYGON_API_KEY")
     BUCKET_NAME = os.getenv("BUCKET_NAME")
     SNS_TOPIC_ARN = os.getenv("SNS_TOPIC_ARN")
-    TIMEZONE = os.getenv("TIMEZONE", "America/Chicago")
-    s3 = boto3.client("s3")
-    sns = boto3.client("sns")
-    client = RESTClient(POLYGON_API_KEY)
+    s3 = _aws_client("s3")
+    sns = _aws_client("sns")
+    global _POLYGON_CLIENT
+    if _POLYGON_CLIENT is None:
+        _POLYGON_CLIENT = RESTClient(POLYGON_API_KEY)  # Keeps its HTTP connection pool across invocations
+        # urllib3 keeps one connection per host by default; keep one per fetch worker instead
+        _POLYGON_CLIENT.client.connection_pool_kw["maxsize"] = FETCH_WORKERS
+    client = _POLYGON_CLIENT
 
     # Get timepoint and symbol_mode from event
-    timepoint = event.get("timepoint", datetime.now(pytz.timezone(TIMEZONE)).strftime("%H:%M"))
+    now = datetime.now(TIMEZONE)
+    timepoint = event.get("timepoint", now.strftime("%H:%M"))
     symbol_mode = event.get("symbol_mode") or "Dynamic"
 
+    date_str = now.strftime("%Y-%m-%d")
+
     # Get symbol list
     if symbol_mode == "Dynamic":
-        symbols = get_dynamic_nasdaq_symbols(client, limit=100)
+        symbols = get_cached_nasdaq_symbols(s3, BUCKET_NAME, client, date_str, limit=100)
     else:
         symbols = get_static_nasdaq_symbols()
 
     # Fetch and screen data
-    stocks_data = []
-    for symbol in symbols:
-        data = fetch_stock_data(client, symbol)
-        if data is not None:
-            stocks_data.append(data)
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        results = executor.map(lambda symbol: fetch_stock_data(client, symbol), symbols)
+        stocks_data = [data for data in results if data is not None]
     # Ignore stocks with N/A data (already filtered)
-    # Apply screening criteria
-    qualified = [s for s in stocks_data if apply_screening_criteria(s)]
 
     # Prepare DataFrame for S3
-    date_str = datetime.now(pytz.timezone(TIMEZONE)).strftime("%Y-%m-%d")
     timestamp_cdt = timepoint + ":00"
-    for s in stocks_data:
-        s["date"] = date_str
-        s["timestamp_cdt"] = timestamp_cdt
-    df = pd.DataFrame(stocks_data)
-    # Reorder columns to match schema
+    # Add the constant date/time columns in one assignment and reorder columns to match schema
     columns = ["symbol", "date", "timestamp_cdt", "open", "high", "low", "close", "volume", "prev_close", "market_cap", "avg_volume", "change_pct"]
-    df = df[columns]
+    # Transpose the fetched rows so pandas builds each column from one sequence
+    field_values = list(zip(*stocks_data)) or [()] * len(SNAPSHOT_FIELDS)
+    df = pd.DataFrame(dict(zip(SNAPSHOT_FIELDS, field_values))).assign(date=date_str, timestamp_cdt=timestamp_cdt)[columns]
 
-    # S3 file path
-    s3_key = f"stock_data/{date_str}/screening-results-{date_str}.csv"
-    # Download existing CSV if exists, append new data
-    try:
-        csv_obj = s3.get_object(Bucket=BUCKET_NAME, Key=s3_key)
-        existing_df = pd.read_csv(csv_obj["Body"])
-        df = pd.concat([existing_df, df], ignore_index=True)
-    except s3.exceptions.NoSuchKey:
-        pass  # No existing file, will create new
-    except Exception as e:
-        print(f"Error reading existing CSV: {e}")
-    # Write to S3
-    csv_buffer = StringIO()
-    df.to_csv(csv_buffer, index=False)
-    s3.put_object(Bucket=BUCKET_NAME, Key=s3_key, Body=csv_buffer.getvalue())
+    # Apply screening criteria over the numeric columns in one pass
+    mask = apply_screening_criteria(
+        df["volume"].to_numpy(dtype=np.float64),
+        df["change_pct"].to_numpy(dtype=np.float64),
+        df["prev_close"].to_numpy(dtype=np.float64),
+        df["open"].to_numpy(dtype=np.float64)
+    )
+    qualified = df[mask].to_dict("records")
+
+    # One small file per timepoint, so each run writes only its own snapshot; readers union the day's prefix
+    timepoint_key = f"stock_data/{date_str}/timepoint={timepoint.replace(':', '')}"
+    # Upload straight from the encoded buffer so no second copy of the file is built
+    output_buffer = BytesIO()
+    if pq is not None:
+        s3_key = f"{timepoint_key}.parquet"
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), output_buffer, compression="snappy")
+    else:
+        s3_key = f"{timepoint_key}.csv.gz"
+        df.to_csv(output_buffer, index=False, compression="gzip")
+    output_buffer.seek(0)
+    s3.upload_fileobj(output_buffer, BUCKET_NAME, s3_key)
 
     # Format alert message
     def format_alert_message(stocks, timepoint):
@@ -3,18 +3,15 @@ import csv
 import json
 import asyncio
 import pandas as pd
-from datetime import datetime, timedelta
-import pytz
-from collections import defaultdict
+from datetime import datetime
+from zoneinfo import ZoneInfo
 import boto3
-from io import StringIO
 import logging
-from typing import Dict, List, Set
+from typing import List
 import time
 import aiohttp
 import numpy as np
 
-import websockets
 from polygon import RESTClient
 
 # Load environment variables
@@ -30,38 +27,121 @@ AWS_S3_ENABLED = True # Toggle S3 upload
 S3_BUCKET = os.getenv('BUCKET_NAME')
 S3_PREFIX = "stock_data/real-time-monitor/"
 POLL_INTERVAL = 60  # seconds
+S3_MIN_PART_SIZE = 5 * 1024 * 1024  # Smallest S3 multipart part other than the last
+RAW_CSV_ROTATE_BYTES = 64 * 1024 * 1024  # Raw CSV size that starts a new file before the hour is up
 FILTER_START_DELAY = 420  # 7 minutes (420 seconds)
+# WebSocket channels: T = trades, Q = quotes, A = second aggregates, AM = minute aggregates.
+# Snapshots are written once a minute, so second bars carry everything they need at a fraction of the trade rate.
+SUBSCRIBE_GRANULARITY = os.getenv('SUBSCRIBE_GRANULARITY', 'second').strip().lower()  # trade | second | minute
+GRANULARITY_CHANNELS = {'trade': ("T",), 'second': ("A",), 'minute': ("AM",)}
+SUBSCRIBE_CHUNK_SIZE = 1000  # Symbols per subscribe frame
+QUOTE_MIN_INTERVAL_MS = 1000  # Quotes for a symbol arriving sooner than this after the last applied one are dropped
 POLYGON_API_KEY = os.getenv('POLYGON_API_KEY')
 
+# Raw snapshots go to Snappy Parquet parts when pyarrow is installed; MONITOR_RAW_FORMAT=csv keeps the CSV
+MONITOR_RAW_FORMAT = os.getenv('MONITOR_RAW_FORMAT', 'parquet')
+PARQUET_FLUSH_SNAPSHOTS = 10  # Snapshots buffered per raw Parquet part file
+
+# Polygon REST endpoints called directly rather than through the SDK
+POLYGON_TICKERS_URL = "https://api.polygon.io/v3/reference/tickers"
+SHARES_FETCH_CONCURRENCY = 20  # Concurrent share_class_shares_outstanding lookups (and keep-alive connections)
+SNAPSHOT_CACHE_TTL = 60  # seconds a saved all-tickers snapshot is reused across restarts
+SNAPSHOT_CACHE_DIR = os.getenv('SNAPSHOT_CACHE_DIR', os.path.join('cache', 'snapshots'))
+# Lower bounds of the ticker ranges fetch_nasdaq_symbols pages concurrently
+TICKER_RANGE_STARTS = ('', 'C', 'F', 'J', 'M', 'P', 'S', 'V')
+POLYGON_SNAPSHOT_URL = "https://api.polygon.io/v2/snapshot/locale/us/markets/stocks/tickers"
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Use orjson for REST and WebSocket payloads when it is installed
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Run the monitor on uvloop's libuv event loop when it is installed (Linux/macOS only)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# numba is optional; without it trades are applied one event at a time in Python
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+if njit is not None:
+    @njit(cache=True)
+    def _apply_trades(idx, price, size, current_price, volume, day_high, day_low):
+        # Sequential so repeated trades for a symbol within a frame apply in arrival order
+        for k in range(idx.shape[0]):
+            i = idx[k]
+            p = price[k]
+            current_price[i] = p
+            volume[i] += size[k]
+            if p > day_high[i]:
+                day_high[i] = p
+            if not day_low[i] <= p:  # Also true while day_low is still NaN
+                day_low[i] = p
+
+    # Compile (or load from cache) now rather than on the first live frame
+    _apply_trades(np.zeros(1, dtype=np.int64), *(np.zeros(1) for _ in range(6)))
+else:
+    _apply_trades = None
+
+CST = ZoneInfo('America/Chicago')  # Trading-day clock for module-level date keys
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# A bad value must not stop the REST steps that import this module without streaming
+if SUBSCRIBE_GRANULARITY not in GRANULARITY_CHANNELS:
+    logger.warning("Unknown SUBSCRIBE_GRANULARITY %r (expected trade|second|minute); using 'second'", SUBSCRIBE_GRANULARITY)
+    SUBSCRIBE_GRANULARITY = 'second'
+SUBSCRIBE_CHANNELS = GRANULARITY_CHANNELS[SUBSCRIBE_GRANULARITY]
+
 class NASDAQMonitor:
     def __init__(self):
         self.rest_client = RESTClient(POLYGON_API_KEY)
-        self.stocks_data = defaultdict(dict)  # Store latest data for each stock
         self.nasdaq_symbols = set()
+        self._allocate_arrays()  # Latest data per stock, one array per field
         self.qualified_symbols = set()
         self.start_time = None
+        self._filter_deadline = None  # start_time + FILTER_START_DELAY once running
         self.filter_enabled = False
         self.running = True
-        self.cst = pytz.timezone('America/Chicago')
-        self.data_lock = asyncio.Lock()
+        self.cst = CST  # Cached tz rules; cheaper per now() than pytz was
         
         # S3 client
         if AWS_S3_ENABLED:
             self.s3_client = boto3.client('s3')
+        self._s3_uploaded = {}  # Bytes of each local file already present in S3
+        self._http = None  # aiohttp session, created on first use inside the running loop
+        self._pending_write = None  # Latest file-writing thread; shutdown waits for it before closing files
         
         # File paths
-        self.date_str = datetime.now(self.cst).strftime('%Y%m%d')
-        self.start_time_str = datetime.now(self.cst).strftime('%H%M')
+        now = datetime.now(self.cst)
+        self.date_str = now.strftime('%Y%m%d')
+        self.start_time_str = now.strftime('%H%M')
         self.raw_file = f'nasdaq_monitor_raw_{self.date_str}_{self.start_time_str}.csv'
+        self._raw_hour = now.hour  # The raw CSV rolls over to a new file every hour or RAW_CSV_ROTATE_BYTES
+        self.raw_files = []  # Every raw CSV this session, listed in the manifest
+        self.manifest_file = f'nasdaq_monitor_raw_{self.date_str}_{self.start_time_str}_manifest.json'
+        self._manifest_pending = False  # Manifest changed since it was last uploaded
+        self._rotated_raw_files = []  # Closed raw CSVs whose final bytes still need uploading
+        self.raw_parquet = pq is not None and MONITOR_RAW_FORMAT == 'parquet'
         self.filtered_file = f'nasdaq_monitor_filtered_{self.date_str}_{self.start_time_str}.csv'
         
         # CSV headers
         self.headers = [
-            'timestamp', 'symbol', 'market_cap_millions', 'previous_close', 'open',
+            'timestamp', 'symbol', 'share_class_shares_outstanding', 'intraday_market_cap_millions', 'previous_close', 'open',
             'current_price', 'bid', 'ask', 'volume', 'day_high', 'day_low',
             'change_pct', 'change_from_open_pct', 'meets_criteria'
         ]
@@ -70,11 +150,85 @@ class NASDAQMonitor:
         self._initialize_csv_files()
     
     def _initialize_csv_files(self):
-        """Create CSV files with headers"""
-        with open(self.raw_file, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=self.headers)
-            writer.writeheader()
-        logger.info(f"Created raw data file: {self.raw_file}")
+        """Create CSV files with headers and keep them open for the snapshot appends"""
+        self._filtered_fh = None  # Opened with its header on the first qualifying snapshot
+        if self.raw_parquet:
+            # Raw snapshots are buffered as DataFrames and written as numbered Parquet parts
+            self._raw_fh = None
+            self._raw_frames = []
+            self._raw_part = 0
+            # Fixed up front: pyarrow would infer null types for an empty snapshot's object columns
+            text_columns = {'timestamp', 'symbol', 'meets_criteria'}
+            self._raw_schema = pa.schema([
+                (col, pa.string() if col in text_columns
+                 else pa.int64() if col == 'share_class_shares_outstanding' else pa.float64())
+                for col in self.headers
+            ])
+            return
+        self._open_raw_csv()
+    
+    def _open_raw_csv(self):
+        self._raw_fh = open(self.raw_file, 'w', buffering=1 << 20, newline='')
+        pd.DataFrame(columns=self.headers).to_csv(self._raw_fh, index=False)
+        logger.info("Created raw data file: %s", self.raw_file)
+        # Readers find the session's files through the manifest instead of listing the prefix
+        self.raw_files.append(self.raw_file)
+        with open(self.manifest_file, 'w') as f:
+            json.dump({'headers': self.headers, 'files': self.raw_files}, f)
+        self._manifest_pending = True
+    
+    def _rotate_raw_csv(self, now):
+        """Close the current raw CSV and start a new one, keeping each file and S3 object bounded"""
+        self._raw_fh.close()
+        self._rotated_raw_files.append(self.raw_file)
+        self.raw_file = f'nasdaq_monitor_raw_{now:%Y%m%d}_{now:%H%M}_{len(self.raw_files):03d}.csv'
+        self._raw_hour = now.hour
+        self._open_raw_csv()
+    
+    def _allocate_arrays(self):
+        """Give every tracked symbol an integer id and a slot in each per-field array"""
+        self.symbols = np.array(sorted(self.nasdaq_symbols), dtype=object)
+        self.sym_id = {symbol: i for i, symbol in enumerate(self.symbols)}
+        n = len(self.symbols)
+        self.previous_close = np.zeros(n)
+        self.open = np.zeros(n)
+        self.current_price = np.full(n, np.nan)  # NaN until a price is known
+        self.bid = np.zeros(n)
+        self.ask = np.zeros(n)
+        self.volume = np.zeros(n)
+        self.day_high = np.zeros(n)
+        self.day_low = np.full(n, np.nan)  # NaN until the first trade
+        self.shares_outstanding = np.full(n, np.nan)
+        self._last_quote_ts = np.full(n, -np.inf)  # SIP timestamp (ms) of the last applied quote
+        self._subscribe_frames = None  # Rebuilt lazily for the new universe
+    
+    async def _fetch_ticker_range(self, session, lower, upper):
+        """Page through NASDAQ tickers in [lower, upper) on the event loop, following next_url"""
+        url = POLYGON_TICKERS_URL
+        params = {'market': 'stocks', 'exchange': 'XNAS', 'active': 'true', 'limit': 1000, 'apiKey': POLYGON_API_KEY}
+        if lower:
+            params['ticker.gte'] = lower
+        if upper:
+            params['ticker.lt'] = upper
+        symbols = []
+        page_count = 0
+        
+        while url:
+            page_count += 1
+            async with session.get(url, params=params) as resp:
+                resp.raise_for_status()
+                page = _loads(await resp.read())
+            
+            # Process the current page
+            page_symbols = [ticker['ticker'] for ticker in page.get('results', [])]
+            symbols.extend(page_symbols)
+            logger.info("Range %s-%s page %d: Found %d symbols, total: %d",
+                        lower or 'start', upper or 'end', page_count, len(page_symbols), len(symbols))
+            
+            # next_url carries the cursor (and the range filter) but not the API key
+            url = page.get('next_url')
+            params = {'apiKey': POLYGON_API_KEY}
+        return symbols
     
     async def fetch_nasdaq_symbols(self):
         """Fetch all NASDAQ symbols from Polygon using efficient pagination"""
@@ -82,61 +236,34 @@ class NASDAQMonitor:
         symbols = []
         
         try:
-            # Use pagination efficiently
-            next_url = None
-            page_count = 0
+            # Each ticker range has its own cursor chain, so the ranges are paged concurrently
+            bounds = list(TICKER_RANGE_STARTS) + [None]
+            session = self._http_session()
+            ranges = await asyncio.gather(*(
+                self._fetch_ticker_range(session, lower, upper) for lower, upper in zip(bounds, bounds[1:])
+            ))
+            symbols = [symbol for range_symbols in ranges for symbol in range_symbols]
             
-            while True:
-                page_count += 1
-                if next_url:
-                    # Parse the cursor from next_url
-                    tickers_response = self.rest_client.list_tickers(
-                        market="stocks",
-                        exchange="XNAS",
-                        active=True,
-                        limit=1000,
-                        cursor=next_url.split('cursor=')[1] if 'cursor=' in next_url else None
-                    )
-                else:
-                    tickers_response = self.rest_client.list_tickers(
-                        market="stocks",
-                        exchange="XNAS",
-                        active=True,
-                        limit=1000
-                    )
-                
-                # Process the current page
-                page_symbols = []
-                for ticker in tickers_response:
-                    page_symbols.append(ticker.ticker)
-                
-                symbols.extend(page_symbols)
-                logger.info(f"Page {page_count}: Found {len(page_symbols)} symbols, total: {len(symbols)}")
-                
-                # Check if there's a next page
-                if hasattr(tickers_response, 'next_url') and tickers_response.next_url:
-                    next_url = tickers_response.next_url
-                else:
-                    break
-                
-                # Safety limit
-                if len(symbols) >= 10000:
-                    logger.warning(f"Reached safety limit of 10000 symbols")
-                    break
+            # Safety limit
+            if len(symbols) >= 10000:
+                logger.warning("Reached safety limit of 10000 symbols")
+                symbols = symbols[:10000]
             
             # LIMIT TO FIRST 100 SYMBOLS FOR TESTING
             # symbols = symbols[:100]
             self.nasdaq_symbols = set(symbols)
-            logger.info(f"Using first {len(self.nasdaq_symbols)} NASDAQ symbols for testing: {list(self.nasdaq_symbols)[:5]} ...")
+            logger.info("Using first %d NASDAQ symbols for testing: %s ...", len(self.nasdaq_symbols), list(self.nasdaq_symbols)[:5])
             
             # Fetch initial data using efficient snapshot API
+            self._allocate_arrays()
             await self.fetch_initial_data()
             
         except Exception as e:
-            logger.error(f"Error fetching NASDAQ symbols: {e}")
+            logger.error("Error fetching NASDAQ symbols: %s", e)
             # Fallback to a small test set
             self.nasdaq_symbols = {'AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'META', 'NVDA', 'AMD', 'NFLX', 'TSLA'}
-            logger.info(f"Using test set of {len(self.nasdaq_symbols)} symbols")
+            self._allocate_arrays()
+            logger.info("Using test set of %d symbols", len(self.nasdaq_symbols))
     
     async def fetch_initial_data(self):
         """Fetch initial data (market cap, open, previous close) for all symbols using minimal API calls"""
@@ -144,27 +271,41 @@ class NASDAQMonitor:
         
         # Use snapshot endpoint for bulk data - much more efficient
         try:
-            # Get all snapshots in one call
-            snapshots = self.rest_client.get_snapshot_all("stocks")
+            # Get all snapshots in one call, on the event loop, decoded into plain dicts.
+            # A restart within SNAPSHOT_CACHE_TTL reuses the last response; the file name carries the session date.
+            cache_path = os.path.join(SNAPSHOT_CACHE_DIR, f'snapshot_cache_{self.date_str}.json')
+            if os.path.exists(cache_path) and time.time() - os.path.getmtime(cache_path) < SNAPSHOT_CACHE_TTL:
+                body = await asyncio.to_thread(self._read_file, cache_path)
+                logger.info("Using cached snapshot %s", cache_path)
+            else:
+                async with self._http_session().get(POLYGON_SNAPSHOT_URL, params={'apiKey': POLYGON_API_KEY}) as resp:
+                    resp.raise_for_status()
+                    body = await resp.read()
+                await asyncio.to_thread(self._save_snapshot_cache, cache_path, body)
+            snapshots = _loads(body).get('tickers') or []
+            fetched = 0
             
             for snapshot in snapshots:
-                symbol = snapshot.ticker
-                if symbol in self.nasdaq_symbols:
-                    async with self.data_lock:
-                        self.stocks_data[symbol].update({
-                            'market_cap_millions': getattr(snapshot, 'market_cap', 0) / 1_000_000 if hasattr(snapshot, 'market_cap') else 0,
-                            'previous_close': snapshot.prev_day.close if snapshot.prev_day else 0,
-                            'open': snapshot.day.open if snapshot.day else 0,
-                            'volume': snapshot.day.volume if snapshot.day else 0,
-                            'day_high': snapshot.day.high if snapshot.day else 0,
-                            'day_low': snapshot.day.low if snapshot.day else float('inf'),
-                            'current_price': snapshot.day.close if snapshot.day else 0
-                        })
+                i = self.sym_id.get(snapshot.get('ticker'))
+                if i is None:
+                    continue
+                fetched += 1
+                prev_day = snapshot.get('prevDay')
+                self.previous_close[i] = prev_day.get('c', 0) if prev_day else 0
+                day = snapshot.get('day')
+                if day:
+                    self.open[i] = day.get('o', 0)
+                    self.volume[i] = day.get('v', 0)
+                    self.day_high[i] = day.get('h', 0)
+                    self.day_low[i] = day.get('l', 0)
+                    self.current_price[i] = day.get('c', 0)
+                else:
+                    self.current_price[i] = 0
             
-            logger.info(f"Initial data fetched for {len(self.stocks_data)} symbols using snapshot API")
+            logger.info("Initial data fetched for %d symbols using snapshot API", fetched)
             
         except Exception as e:
-            logger.error(f"Error fetching snapshot data: {e}")
+            logger.error("Error fetching snapshot data: %s", e)
             # Fallback to individual calls only if snapshot fails
             logger.info("Falling back to individual API calls...")
             
@@ -173,194 +314,343 @@ class NASDAQMonitor:
             for symbol in limited_symbols:
                 try:
                     # Get previous day data
-                    prev_day = self.rest_client.get_previous_close(symbol)
+                    prev_day = await asyncio.to_thread(self.rest_client.get_previous_close, symbol)
                     if prev_day and len(prev_day) > 0:
-                        async with self.data_lock:
-                            self.stocks_data[symbol].update({
-                                'market_cap_millions': 0,  # Skip market cap in fallback
-                                'previous_close': prev_day[0].close,
-                                'open': prev_day[0].open,
-                                'volume': 0,
-                                'day_high': 0,
-                                'day_low': float('inf')
-                            })
+                        i = self.sym_id[symbol]
+                        self.previous_close[i] = prev_day[0].close
+                        self.open[i] = prev_day[0].open
                 except Exception as e:
-                    logger.debug(f"Error fetching data for {symbol}: {e}")
+                    logger.debug("Error fetching data for %s: %s", symbol, e)
     
-    def calculate_qualifying_criteria(self, symbol: str) -> bool:
-        """Check if stock meets all qualifying criteria"""
-        data = self.stocks_data.get(symbol, {})
-        
-        # Get required values
-        volume = data.get('volume', 0)
-        prev_close = data.get('previous_close', 0)
-        open_price = data.get('open', 0)
-        current_price = data.get('current_price', 0)
+    @staticmethod
+    def _read_file(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    
+    @staticmethod
+    def _save_snapshot_cache(cache_path, body):
+        """Save today's snapshot response and delete earlier days' copies"""
+        os.makedirs(SNAPSHOT_CACHE_DIR, exist_ok=True)
+        with open(cache_path, 'wb') as f:
+            f.write(body)
+        for entry in os.scandir(SNAPSHOT_CACHE_DIR):
+            if (entry.name.startswith('snapshot_cache_') and entry.name.endswith('.json')
+                    and entry.path != cache_path):
+                os.remove(entry.path)
+    
+    def _http_session(self):
+        """Long-lived aiohttp session shared by every REST call, so connections are reused across ticks"""
+        if self._http is None or self._http.closed:
+            connector = aiohttp.TCPConnector(limit=100, limit_per_host=SHARES_FETCH_CONCURRENCY, keepalive_timeout=75)
+            self._http = aiohttp.ClientSession(connector=connector)
+        return self._http
+    
+    async def fetch_missing_shares_outstanding(self, where=None):
+        """Fill NaN shares_outstanding (optionally only where the mask is set), SHARES_FETCH_CONCURRENCY at a time"""
+        missing = np.isnan(self.shares_outstanding)
+        if where is not None:
+            missing &= where
+        session = self._http_session()
+        semaphore = asyncio.Semaphore(SHARES_FETCH_CONCURRENCY)
         
-        # Calculate change from previous close
-        if prev_close > 0:
-            change_pct = ((current_price - prev_close) / prev_close) * 100
-        else:
-            change_pct = 0
+        async def fetch(i):
+            async with semaphore:
+                try:
+                    shares_out = await fetch_shares_outstanding(session, self.symbols[i], POLYGON_API_KEY)
+                except Exception:
+                    return
+            if shares_out is not None:
+                self.shares_outstanding[i] = shares_out
         
-        # Check all criteria
-        meets_criteria = (
-            volume > 300_000 and
-            change_pct >= 2.5 and
-            prev_close >= 0.01 and
-            current_price > open_price
+        await asyncio.gather(*(fetch(i) for i in np.flatnonzero(missing)))
+    
+    @staticmethod
+    def qualifying_mask(volume, prev_close, open_price, current_price):
+        """Vectorized qualifying criteria over per-symbol float arrays; returns (mask, change_pct)"""
+        # Calculate change from previous close, 0 where there is no previous close
+        change_pct = np.divide((current_price - prev_close) * 100, prev_close,
+                               out=np.zeros_like(prev_close), where=prev_close > 0)
+        mask = (
+            (volume > 300_000) &
+            (change_pct >= 2.5) &
+            (prev_close >= 0.01) &
+            (current_price > open_price)
         )
-        
-        return meets_criteria
+        return mask, change_pct
     
-    async def handle_message(self, msg):
+    def handle_message(self, msg):
         """Handle incoming WebSocket messages (raw JSON)"""
+        # Polygon packs many events into each frame; apply the whole batch synchronously
+        # instead of awaiting a coroutine per event
         try:
-            data = json.loads(msg)
-            if isinstance(data, list):
+            data = _loads(msg)
+            if not isinstance(data, list):
+                data = [data] if isinstance(data, dict) else []
+            sym_id = self.sym_id
+            handlers = self._EVENT_HANDLERS
+            if _apply_trades is None:
                 for event in data:
-                    await self._process_event(event)
-            elif isinstance(data, dict):
-                await self._process_event(data)
+                    # Skip symbols outside the universe and unknown event types before touching any array
+                    i = sym_id.get(event.get('sym'))
+                    if i is None:
+                        self._log_status(event)
+                        continue
+                    handler = handlers.get(event.get('ev'))
+                    if handler is not None:
+                        handler(self, i, event)
+                return
+            # Gather the frame's trades and apply them in one jitted call
+            trades = []
+            for event in data:
+                i = sym_id.get(event.get('sym'))
+                if i is None:
+                    self._log_status(event)
+                    continue
+                ev_type = event.get('ev')
+                if ev_type == 'T':
+                    trades.append((i, event.get('p', 0), event.get('s', 0)))
+                    continue
+                handler = handlers.get(ev_type)
+                if handler is not None:
+                    # Apply earlier trades first so each symbol's events keep their order
+                    self._flush_trades(trades)
+                    trades = []
+                    handler(self, i, event)
+            self._flush_trades(trades)
         except Exception as e:
-            logger.error(f"Error handling message: {e}")
+            logger.error("Error handling message: %s", e)
     
-    async def _process_event(self, event):
-        symbol = event.get('sym')
-        ev_type = event.get('ev')
-        if not symbol or not ev_type:
+    @staticmethod
+    def _log_status(event):
+        # Connection, auth and subscription results arrive in-stream as status events (they carry no symbol)
+        if event.get('ev') == 'status':
+            logger.info("Status %s: %s", event.get('status'), event.get('message'))
+    
+    def _flush_trades(self, trades):
+        """Apply (sym_id, price, size) trades with the numba kernel"""
+        if not trades:
             return
-        async with self.data_lock:
-            if symbol not in self.stocks_data:
-                self.stocks_data[symbol] = {}
-            if ev_type == 'T':  # Trade event
-                self.stocks_data[symbol]['current_price'] = event.get('p', 0)
-                self.stocks_data[symbol]['volume'] = self.stocks_data[symbol].get('volume', 0) + event.get('s', 0)
-                # Update high/low
-                current_high = self.stocks_data[symbol].get('day_high', 0)
-                current_low = self.stocks_data[symbol].get('day_low', float('inf'))
-                price = event.get('p', 0)
-                self.stocks_data[symbol]['day_high'] = max(current_high, price)
-                self.stocks_data[symbol]['day_low'] = min(current_low, price)
-            elif ev_type == 'Q':  # Quote event
-                self.stocks_data[symbol]['bid'] = event.get('b', 0)
-                self.stocks_data[symbol]['ask'] = event.get('a', 0)
-            elif ev_type == 'AM':  # Minute aggregate
-                self.stocks_data[symbol]['current_price'] = event.get('c', 0)
-                self.stocks_data[symbol]['volume'] = event.get('v', 0)
-                self.stocks_data[symbol]['day_high'] = event.get('h', 0)
-                self.stocks_data[symbol]['day_low'] = event.get('l', 0)
+        batch = np.array(trades, dtype=np.float64)
+        _apply_trades(batch[:, 0].astype(np.int64), batch[:, 1], batch[:, 2],
+                      self.current_price, self.volume, self.day_high, self.day_low)
+    
+    # No lock needed in the _apply_* handlers: nothing awaits, so each update runs atomically on the event loop
+    def _apply_trade(self, i, event):
+        price = event.get('p', 0)
+        self.current_price[i] = price
+        self.volume[i] += event.get('s', 0)
+        # Update high/low
+        if price > self.day_high[i]:
+            self.day_high[i] = price
+        if not self.day_low[i] <= price:  # Also true while day_low is still NaN
+            self.day_low[i] = price
+    
+    def _apply_quote(self, i, event):
+        # Only bid/ask as of the next snapshot is written, so apply at most one quote per interval
+        ts = event.get('t')
+        if ts is not None:  # Quotes without a timestamp cannot be throttled, so they always apply
+            if ts - self._last_quote_ts[i] < QUOTE_MIN_INTERVAL_MS:
+                return
+            self._last_quote_ts[i] = ts
+        self.bid[i] = event.get('b', 0)
+        self.ask[i] = event.get('a', 0)
+    
+    def _apply_aggregate(self, i, event):
+        # Second (A) and minute (AM) bars: 'av' is today's accumulated volume, 'v' only the bar's
+        self.current_price[i] = event.get('c', 0)
+        self.volume[i] = event.get('av', 0)
+        high = event.get('h', 0)
+        if high > self.day_high[i]:
+            self.day_high[i] = high
+        low = event.get('l', 0)
+        if not self.day_low[i] <= low:  # Also true while day_low is still NaN
+            self.day_low[i] = low
+    
+    # Event type ('ev') -> handler; one dict lookup instead of an if/elif chain per event
+    _EVENT_HANDLERS = {'T': _apply_trade, 'Q': _apply_quote, 'A': _apply_aggregate, 'AM': _apply_aggregate}
+    
+    def subscribe_frames(self) -> List[str]:
+        """JSON subscribe frames for SUBSCRIBE_CHANNELS x all symbols, built once per symbol universe"""
+        if self._subscribe_frames is None:
+            # self.symbols is sorted, so the chunks are identical from run to run
+            self._subscribe_frames = [
+                json.dumps({"action": "subscribe", "params": ",".join(
+                    f"{ch}.{s}" for ch in SUBSCRIBE_CHANNELS for s in self.symbols[start:start + SUBSCRIBE_CHUNK_SIZE]
+                )})
+                for start in range(0, len(self.symbols), SUBSCRIBE_CHUNK_SIZE)
+            ]
+        return self._subscribe_frames
     
     async def write_data_snapshot(self):
         """Write current data snapshot to CSV"""
-        import aiohttp
-        timestamp = datetime.now(self.cst).strftime('%Y-%m-%d %H:%M:%S')
-        rows = []
-        async with self.data_lock:
-            async with aiohttp.ClientSession() as session:
-                for symbol in self.nasdaq_symbols:
-                    if symbol not in self.stocks_data:
-                        continue
-                    data = self.stocks_data[symbol]
-                    # Skip if no current price
-                    if 'current_price' not in data:
-                        continue
-                    prev_close = data.get('previous_close', 0)
-                    open_price = data.get('open', 0)
-                    current_price = data.get('current_price', 0)
-                    # Get shares outstanding, fetch if not present
-                    shares_out = data.get('share_class_shares_outstanding')
-                    if shares_out is None:
-                        base_url = "https://api.polygon.io"
-                        company_url = f"{base_url}/v3/reference/tickers/{symbol}?apiKey={POLYGON_API_KEY}"
-                        try:
-                            async with session.get(company_url) as resp:
-                                company_data = await resp.json()
-                                if company_data.get('status') == 'OK' and company_data.get('results'):
-                                    shares_out = company_data['results'].get('share_class_shares_outstanding')
-                                    data['share_class_shares_outstanding'] = shares_out
-                        except Exception as e:
-                            shares_out = None
-                    # Calculate intraday market cap
-                    try:
-                        if shares_out is not None and current_price is not None:
-                            intraday_market_cap_millions = float(shares_out) * float(current_price) / 1_000_000
-                        else:
-                            intraday_market_cap_millions = None
-                    except Exception:
-                        intraday_market_cap_millions = None
-                    change_pct = ((current_price - prev_close) / prev_close * 100) if prev_close > 0 else 0
-                    change_from_open_pct = ((current_price - open_price) / open_price * 100) if open_price > 0 else 0
-                    meets_criteria = self.calculate_qualifying_criteria(symbol)
-                    row = {
-                        'timestamp': timestamp,
-                        'symbol': symbol,
-                        'share_class_shares_outstanding': shares_out,
-                        'intraday_market_cap_millions': f"{intraday_market_cap_millions:.2f}" if intraday_market_cap_millions is not None else 'N/A',
-                        'previous_close': f"{prev_close:.2f}",
-                        'open': f"{open_price:.2f}",
-                        'current_price': f"{current_price:.2f}",
-                        'bid': f"{data.get('bid', 0):.2f}",
-                        'ask': f"{data.get('ask', 0):.2f}",
-                        'volume': data.get('volume', 0),
-                        'day_high': f"{data.get('day_high', 0):.2f}",
-                        'day_low': f"{data.get('day_low', 0):.2f}" if data.get('day_low', float('inf')) != float('inf') else "0.00",
-                        'change_pct': f"{change_pct:.2f}",
-                        'change_from_open_pct': f"{change_from_open_pct:.2f}",
-                        'meets_criteria': 'Y' if meets_criteria else 'N'
-                    }
-                    rows.append(row)
-                    if meets_criteria:
-                        self.qualified_symbols.add(symbol)
-                    elif symbol in self.qualified_symbols:
-                        self.qualified_symbols.remove(symbol)
-        # Update headers
-        self.headers = [
-            'timestamp', 'symbol', 'share_class_shares_outstanding', 'intraday_market_cap_millions', 'previous_close', 'open',
-            'current_price', 'bid', 'ask', 'volume', 'day_high', 'day_low',
-            'change_pct', 'change_from_open_pct', 'meets_criteria'
-        ]
-        with open(self.raw_file, 'a', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=self.headers)
-            writer.writerows(rows)
+        # Formatted once and broadcast to every row by the DataFrame constructor
+        now = datetime.now(self.cst)
+        timestamp = now.strftime('%Y-%m-%d %H:%M:%S')
+        # Top up shares outstanding the startup prefetch missed; this awaits, so it happens before the copy below
+        await self.fetch_missing_shares_outstanding(~np.isnan(self.current_price))
+        # Copy every column with one fancy index each; nothing awaits here, so no message lands mid-snapshot
+        idx = np.flatnonzero(~np.isnan(self.current_price))
+        symbols = self.symbols[idx]
+        shares = self.shares_outstanding[idx]
+        prev_close = self.previous_close[idx]
+        open_price = self.open[idx]
+        current_price = self.current_price[idx]
+        volume = self.volume[idx]
+        meets_criteria, change_pct = self.qualifying_mask(volume, prev_close, open_price, current_price)
+        df = pd.DataFrame({
+            'timestamp': timestamp,
+            'symbol': symbols,
+            'share_class_shares_outstanding': pd.Series(shares).round().astype('Int64'),
+            'intraday_market_cap_millions': shares * current_price / 1_000_000,
+            'previous_close': prev_close,
+            'open': open_price,
+            'current_price': current_price,
+            'bid': self.bid[idx],
+            'ask': self.ask[idx],
+            'volume': volume.astype(np.int64),
+            'day_high': self.day_high[idx],
+            'day_low': np.nan_to_num(self.day_low[idx]),  # Unset lows written as 0.00
+            'change_pct': change_pct,
+            'change_from_open_pct': np.divide((current_price - open_price) * 100, open_price, out=np.zeros_like(open_price), where=open_price > 0),
+            'meets_criteria': np.where(meets_criteria, 'Y', 'N')
+        }, columns=self.headers)
+        self.qualified_symbols = set(symbols[meets_criteria].tolist())
+        # Only the array copies above run on the loop; CSV rendering and file I/O happen in a worker thread
+        writes = []
+        if self.raw_parquet:
+            self._raw_frames.append(df)
+            if len(self._raw_frames) >= PARQUET_FLUSH_SNAPSHOTS:
+                await self._write_in_thread(self._write_raw_parquet, *self._take_raw_frames())
+        else:
+            if now.hour != self._raw_hour or self._raw_fh.tell() >= RAW_CSV_ROTATE_BYTES:
+                self._rotate_raw_csv(now)
+            writes.append((self._raw_fh, df, False))
         if self.filter_enabled and self.qualified_symbols:
-            filtered_rows = [row for row in rows if row['meets_criteria'] == 'Y']
-            if not os.path.exists(self.filtered_file):
-                with open(self.filtered_file, 'w', newline='') as f:
-                    writer = csv.DictWriter(f, fieldnames=self.headers)
-                    writer.writeheader()
-            with open(self.filtered_file, 'a', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=self.headers)
-                writer.writerows(filtered_rows)
+            write_header = self._filtered_fh is None
+            if write_header:
+                self._filtered_fh = open(self.filtered_file, 'w', buffering=1 << 20, newline='')
+            writes.append((self._filtered_fh, df[meets_criteria], write_header))
+        if writes:
+            await self._write_in_thread(self._write_csvs, writes)  # One thread hop for both files
         if AWS_S3_ENABLED:
             await self.upload_to_s3()
-        logger.info(f"Data snapshot written - Total: {len(rows)}, Qualified: {len(self.qualified_symbols)}")
+        logger.info("Data snapshot written - Total: %d, Qualified: %d", len(df), len(self.qualified_symbols))
         if self.filter_enabled and len(self.qualified_symbols) == 0:
             logger.info("No qualifying stocks at this time, continuing to monitor...")
     
+    async def _write_in_thread(self, func, *args):
+        """Run a file write in a worker thread that keeps going, and stays tracked, if the caller is cancelled"""
+        self._pending_write = asyncio.ensure_future(asyncio.to_thread(func, *args))
+        await asyncio.shield(self._pending_write)
+    
+    @staticmethod
+    def _write_csvs(writes):
+        """Append each (handle, frame, header) as CSV; flushed because upload_to_s3 reads the files back"""
+        for fh, frame, header in writes:
+            # Missing shares stay blank as they always were; na_rep only covers the other columns
+            frame = frame.assign(share_class_shares_outstanding=frame['share_class_shares_outstanding'].astype('string').fillna(''))
+            # float_format/na_rep run in pandas' C writer instead of one f-string per cell
+            frame.to_csv(fh, header=header, index=False, float_format='%.2f', na_rep='N/A')
+            fh.flush()
+    
+    def _take_raw_frames(self):
+        """Detach the buffered raw snapshots and name the Parquet part they go to"""
+        frames, self._raw_frames = self._raw_frames, []
+        path = f'nasdaq_monitor_raw_{self.date_str}_{self.start_time_str}_{self._raw_part:04d}.parquet'
+        self._raw_part += 1
+        return path, frames
+    
+    def _write_raw_parquet(self, path, frames):
+        """Write buffered raw snapshots as one Snappy Parquet part, then upload it"""
+        frames = [frame for frame in frames if len(frame)]  # Pre-market snapshots can have no priced symbols
+        if not frames:
+            return
+        # One row group per snapshot, so readers can prune whole snapshots on the timestamp min/max statistics
+        with pq.ParquetWriter(path, self._raw_schema, compression='snappy') as writer:
+            for frame in frames:
+                writer.write_table(pa.Table.from_pandas(frame, schema=self._raw_schema, preserve_index=False))
+        logger.info("Raw snapshots written to %s", path)
+        if AWS_S3_ENABLED:
+            try:
+                with open(path, 'rb') as f:
+                    self.s3_client.put_object(Bucket=S3_BUCKET, Key=f"{S3_PREFIX}{path}", Body=f)
+            except Exception as e:
+                logger.error("Error uploading to S3: %s", e)
+    
+    def close_files(self):
+        """Close the long-lived CSV handles and write out any buffered raw snapshots"""
+        # Each step on its own so one failure cannot leave the others undone
+        if self.raw_parquet:
+            try:
+                self._write_raw_parquet(*self._take_raw_frames())
+            except Exception as e:
+                logger.error("Error writing final raw Parquet part: %s", e)
+        for fh in (self._raw_fh, self._filtered_fh):
+            if fh is not None:
+                try:
+                    fh.close()
+                except Exception as e:
+                    logger.error("Error closing %s: %s", fh.name, e)
+    
+    def _put_to_s3(self, path):
+        """Upload a small, rewritten (not append-only) file whole"""
+        with open(path, 'rb') as f:
+            self.s3_client.put_object(Bucket=S3_BUCKET, Key=f"{S3_PREFIX}{path}", Body=f)
+    
+    def _append_to_s3(self, path):
+        """Bring the S3 copy of a local append-only file up to date, sending only the new bytes"""
+        key = f"{S3_PREFIX}{path}"
+        size = os.path.getsize(path)
+        uploaded = self._s3_uploaded.get(path, 0)
+        if size == uploaded:
+            return
+        with open(path, 'rb') as f:
+            if uploaded < S3_MIN_PART_SIZE:
+                # Too small to be a copied multipart part; re-upload the whole (still small) file
+                self.s3_client.put_object(Bucket=S3_BUCKET, Key=key, Body=f)
+            else:
+                # Rebuild the object server-side: part 1 copies what S3 already holds, part 2 is the tail
+                f.seek(uploaded)
+                tail = f.read()
+                upload_id = self.s3_client.create_multipart_upload(Bucket=S3_BUCKET, Key=key)['UploadId']
+                try:
+                    copied = self.s3_client.upload_part_copy(
+                        Bucket=S3_BUCKET, Key=key, UploadId=upload_id, PartNumber=1,
+                        CopySource={'Bucket': S3_BUCKET, 'Key': key}, CopySourceRange=f"bytes=0-{uploaded - 1}"
+                    )
+                    appended = self.s3_client.upload_part(
+                        Bucket=S3_BUCKET, Key=key, UploadId=upload_id, PartNumber=2, Body=tail
+                    )
+                    self.s3_client.complete_multipart_upload(
+                        Bucket=S3_BUCKET, Key=key, UploadId=upload_id,
+                        MultipartUpload={'Parts': [
+                            {'ETag': copied['CopyPartResult']['ETag'], 'PartNumber': 1},
+                            {'ETag': appended['ETag'], 'PartNumber': 2}
+                        ]}
+                    )
+                except Exception:
+                    self.s3_client.abort_multipart_upload(Bucket=S3_BUCKET, Key=key, UploadId=upload_id)
+                    raise
+        self._s3_uploaded[path] = size
+    
     async def upload_to_s3(self):
         """Upload CSV files to S3"""
         try:
-            # Upload raw file
-            with open(self.raw_file, 'rb') as f:
-                self.s3_client.put_object(
-                    Bucket=S3_BUCKET,
-                    Key=f"{S3_PREFIX}{self.raw_file}",
-                    Body=f.read()
-                )
-            
-            # Upload filtered file if it exists
-            if os.path.exists(self.filtered_file):
-                with open(self.filtered_file, 'rb') as f:
-                    self.s3_client.put_object(
-                        Bucket=S3_BUCKET,
-                        Key=f"{S3_PREFIX}{self.filtered_file}",
-                        Body=f.read()
-                    )
+            # Upload raw file, and the filtered file if it exists, concurrently and off the event loop
+            paths = list(self._rotated_raw_files)
+            if not self.raw_parquet:
+                paths.append(self.raw_file)
+            if self._filtered_fh is not None:
+                paths.append(self.filtered_file)
+            await asyncio.gather(*(asyncio.to_thread(self._append_to_s3, path) for path in paths))
+            self._rotated_raw_files.clear()
+            if self._manifest_pending:
+                await asyncio.to_thread(self._put_to_s3, self.manifest_file)
+                self._manifest_pending = False
             
             logger.info("Files uploaded to S3")
         except Exception as e:
-            logger.error(f"Error uploading to S3: {e}")
+            logger.error("Error uploading to S3: %s", e)
     
     async def periodic_writer(self):
         """Write data snapshots every minute"""
@@ -368,41 +658,97 @@ class NASDAQMonitor:
             await asyncio.sleep(POLL_INTERVAL)
             
             # Enable filtering after 7 minutes
-            if not self.filter_enabled and self.start_time:
-                elapsed = time.time() - self.start_time
-                if elapsed >= FILTER_START_DELAY:
-                    self.filter_enabled = True
-                    logger.info("Filtering enabled - creating filtered output file")
+            if not self.filter_enabled and time.time() >= self._filter_deadline:
+                self.filter_enabled = True
+                logger.info("Filtering enabled - creating filtered output file")
             
-            await self.write_data_snapshot()
+            # One failed snapshot must not end the writer task and every snapshot after it
+            try:
+                await self.write_data_snapshot()
+            except Exception as e:
+                logger.error("Error writing data snapshot: %s", e)
     
     async def run(self):
+        import websockets  # Only the live monitor streams; the scheduled REST steps never need it
         self.start_time = time.time()
+        self._filter_deadline = self.start_time + FILTER_START_DELAY
         await self.fetch_nasdaq_symbols()
+        # Shares outstanding for the whole universe up front, so snapshots rarely need the network
+        await self.fetch_missing_shares_outstanding()
         # Start periodic writer
         writer_task = asyncio.create_task(self.periodic_writer())
         
         uri = "wss://socket.polygon.io/stocks"
         try:
-            async with websockets.connect(uri) as ws:
+            # Bursty multi-event frames can exceed the 1 MiB default max_size; deflate is negotiated if Polygon offers it
+            async with websockets.connect(uri, max_size=None, compression='deflate', ping_interval=20, ping_timeout=20) as ws:
                 logger.info("Connected to Polygon WebSocket!")
-                # Authenticate
+                # Authenticate and subscribe in one burst; Polygon handles them in order, and the auth
+                # result arrives as a status event in the message loop rather than costing a round trip here.
                 await ws.send(json.dumps({"action": "auth", "params": POLYGON_API_KEY}))
-                logger.info(f"Auth response: {await ws.recv()}")
-                # Subscribe to trades for all symbols
-                subscribe_str = ",".join(f"T.{s}" for s in self.nasdaq_symbols)
-                await ws.send(json.dumps({"action": "subscribe", "params": subscribe_str}))
-                logger.info(f"Subscribed to trades for {len(self.nasdaq_symbols)} symbols.")
+                # Subscribe every channel for all symbols, a bounded chunk of symbols per frame, sent back-to-back
+                for frame in self.subscribe_frames():
+                    await ws.send(frame)
+                logger.info("Subscribed to %s for %d symbols.", '/'.join(SUBSCRIBE_CHANNELS), len(self.nasdaq_symbols))
                 # Listen for messages
                 while self.running:
                     msg = await ws.recv()
-                    await self.handle_message(msg)
+                    self.handle_message(msg)
         except Exception as e:
-            logger.error(f"WebSocket connection failed: {e}")
+            logger.error("WebSocket connection failed: %s", e)
         finally:
+            # Cancelling the writer does not stop a write thread, so wait for it before closing its handles
             writer_task.cancel()
+            await asyncio.gather(writer_task, return_exceptions=True)
+            if self._pending_write is not None:
+                await asyncio.gather(self._pending_write, return_exceptions=True)
+            try:
+                self.close_files()
+            finally:
+                if self._http is not None:
+                    await self._http.close()
             logger.info("Monitor stopped")
 
+def run_monitor():
+    """Run NASDAQMonitor until it stops, on uvloop when available"""
+    monitor = NASDAQMonitor()
+    if uvloop is not None:
+        uvloop.run(monitor.run())
+    else:
+        asyncio.run(monitor.run())
+
+# share_class_shares_outstanding keyed by (symbol, YYYYMMDD); it changes at most once a trading day
+_SHARES_OUTSTANDING_CACHE = {}
+# symbol -> time.time() of its last non-OK lookup; retried only after SHARES_RETRY_AFTER
+_SHARES_OUTSTANDING_FAILED = {}
+SHARES_RETRY_AFTER = 15 * 60  # seconds
+SHARES_REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=10)  # A slow lookup must not hold up a snapshot
+
+async def fetch_shares_outstanding(session, symbol, api_key):
+    """
+    Get share_class_shares_outstanding for a symbol from the reference endpoint,
+    calling it at most once per symbol per day, and at most once per SHARES_RETRY_AFTER after an error.
+    """
+    cache_key = (symbol, datetime.now(CST).strftime('%Y%m%d'))
+    if cache_key in _SHARES_OUTSTANDING_CACHE:
+        return _SHARES_OUTSTANDING_CACHE[cache_key]
+    if time.time() - _SHARES_OUTSTANDING_FAILED.get(symbol, 0) < SHARES_RETRY_AFTER:
+        return None
+    company_url = f"https://api.polygon.io/v3/reference/tickers/{symbol}?apiKey={api_key}"
+    try:
+        async with session.get(company_url, timeout=SHARES_REQUEST_TIMEOUT) as resp:
+            company_data = _loads(await resp.read())
+        if company_data.get('status') != 'OK':
+            raise ValueError(f"status {company_data.get('status')}")
+        shares_out = (company_data.get('results') or {}).get('share_class_shares_outstanding')
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError, AttributeError):
+        # Timeouts, resets, non-JSON 429/5xx bodies and error statuses: not cached for the day
+        # so they are retried, but not on every snapshot
+        _SHARES_OUTSTANDING_FAILED[symbol] = time.time()
+        return None
+    _SHARES_OUTSTANDING_CACHE[cache_key] = shares_out
+    return shares_out
+
 def get_premarket_top_gainers(client, date_str, s3_bucket):
     """
     At 8:25am CDT, get premarket top gainer data from polygon.io and add to a CSV on AWS S3.
@@ -422,13 +768,8 @@ def get_premarket_top_gainers(client, date_str, s3_bucket):
                 shares_out = None
                 # Try to fetch shares_outstanding from company endpoint
                 if symbol:
-                    base_url = "https://api.polygon.io"
-                    company_url = f"{base_url}/v3/reference/tickers/{symbol}?apiKey={POLYGON_API_KEY}"
                     try:
-                        async with session.get(company_url) as resp:
-                            company_data = await resp.json()
-                            if company_data.get('status') == 'OK' and company_data.get('results'):
-                                shares_out = company_data['results'].get('share_class_shares_outstanding')
+                        shares_out = await fetch_shares_outstanding(session, symbol, POLYGON_API_KEY)
                     except Exception:
                         shares_out = None
                 try:
@@ -553,20 +894,20 @@ async def fetch_symbol_data_http(session, symbol, api_key):
     result = {"symbol": symbol}
     try:
         async with session.get(company_url) as resp:
-            data = await resp.json()
+            data = _loads(await resp.read())
             if data.get('status') == 'OK' and data.get('results'):
                 r = data['results']
                 result['market_cap'] = r.get('market_cap')
                 result['avg_volume'] = r.get('avg_volume')
         async with session.get(prev_url) as resp:
-            data = await resp.json()
+            data = _loads(await resp.read())
             if data.get('status') == 'OK' and data.get('results'):
                 r = data['results'][0]
                 result['open'] = r.get('o')
                 result['close'] = r.get('c')
                 result['volume'] = r.get('v')
         async with session.get(trade_url) as resp:
-            data = await resp.json()
+            data = _loads(await resp.read())
             if data.get('status') == 'OK' and data.get('results'):
                 r = data['results']
                 result['current_price'] = r.get('p')
@@ -643,14 +984,8 @@ def run_initial_data_pull(client, s3_bucket, api_key, date_str):
                     avg_volume = getattr(snapshot.ticker, 'avg_volume', None) if hasattr(snapshot, 'ticker') else None
                     current_price = getattr(snapshot.last_trade, 'p', None) if hasattr(snapshot, 'last_trade') else None
                     # Fetch shares outstanding
-                    shares_out = None
-                    base_url = "https://api.polygon.io"
-                    company_url = f"{base_url}/v3/reference/tickers/{symbol}?apiKey={api_key}"
                     try:
-                        async with session.get(company_url) as resp:
-                            company_data = await resp.json()
-                            if company_data.get('status') == 'OK' and company_data.get('results'):
-                                shares_out = company_data['results'].get('share_class_shares_outstanding')
+                        shares_out = await fetch_shares_outstanding(session, symbol, api_key)
                     except Exception:
                         shares_out = None
                     try:
@@ -691,10 +1026,10 @@ def run_initial_data_pull(client, s3_bucket, api_key, date_str):
     local_path = filename
     fieldnames = ['symbol', 'open', 'close', 'volume', 'avg_volume', 'current_price', 'share_class_shares_outstanding', 'intraday_market_cap_millions', 'current_price_pct_change_from_open']
     with open(local_path, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in all_data:
-            writer.writerow({k: row.get(k) for k in fieldnames})
+        # Plain writer over positional rows: DictWriter would rebuild and key-check a dict per row
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows([row.get(k) for k in fieldnames] for row in all_data)
     logger.info(f"Raw data written to {local_path}")
     if AWS_S3_ENABLED and s3_bucket:
         s3_key = f"stock_data/{date_str}/{filename}"
@@ -737,6 +1072,23 @@ def ensure_raw_data_with_symbols(date_str, s3_bucket, fieldnames, client):
         logger.info(f"Created and uploaded new {filename} to S3 with {len(symbols)} symbols.")
     return local_path
 
+def pct_change_from_open(df, price_col):
+    """Vectorized % change of price_col from open; NaN where either is missing or zero"""
+    open_ = pd.to_numeric(df['open'], errors='coerce')
+    price = pd.to_numeric(df[price_col], errors='coerce')
+    return ((price - open_) / open_ * 100).where((open_ != 0) & (price != 0))
+
+def qualified_column(df, vol_col, price_col, hhmm):
+    """
+    Vectorized '[HH:MM] - True/False' qualified column: volume > 300K and price >= 2.5% above close.
+    Matches the former row-wise check, whose close/open terms never applied (operator precedence).
+    """
+    vol = pd.to_numeric(df[vol_col], errors='coerce')
+    close = pd.to_numeric(df['close'], errors='coerce')
+    curr = pd.to_numeric(df[price_col], errors='coerce')
+    mask = (vol > 300_000) & (close != 0) & ((curr - close) / close * 100 >= 2.5)
+    return np.where(mask, f"[{hhmm}] - True", f"[{hhmm}] - False")
+
 def update_qualified_column(date_str, s3_bucket, client):
     """
     Step 4: Update the raw_data CSV with a new column 'qualified' using the qualifiers:
@@ -751,28 +1103,10 @@ def update_qualified_column(date_str, s3_bucket, client):
     local_path = ensure_raw_data_with_symbols(date_str, s3_bucket, fieldnames, client)
     filename = os.path.basename(local_path)
     df = pd.read_csv(local_path)
-    # Calculate qualification
-    def is_qualified(row):
-        try:
-            vol = float(row.get('volume', 0) or 0)
-            close = float(row.get('close', 0) or 0)
-            open_ = float(row.get('open', 0) or 0)
-            curr = float(row.get('current_price', 0) or 0)
-            prev_close = float(row.get('close', 0) or 0)  # Using close as previous close at 8:43
-            pct_change = float(row.get('current_price_pct_change_from_open', 0) or 0)
-            return (
-                vol > 300_000 and
-                (curr - prev_close) / prev_close * 100 >= 2.5 if prev_close else False and
-                close >= 0.01 and
-                open_ > close
-            )
-        except Exception as e:
-            logger.error(f"Error qualifying row: {e}")
-            return False
     # Add qualified column with timestamp
-    now = datetime.now(pytz.timezone('America/Chicago'))
+    now = datetime.now(ZoneInfo('America/Chicago'))
     hhmm = now.strftime('%H:%M')
-    df['qualified'] = df.apply(lambda row: f"[{hhmm}] - {'True' if is_qualified(row) else 'False'}", axis=1)
+    df['qualified'] = qualified_column(df, 'volume', 'current_price', hhmm)  # Using close as previous close at 8:43
     # Overwrite CSV
     df.to_csv(local_path, index=False)
     logger.info(f"Updated {filename} with qualified column.")
@@ -804,6 +1138,8 @@ def update_intraday_data_and_qualified(date_str, s3_bucket, hhmm, client):
     vol_col = f'current_volume_{hhmm}'
     mcap_col = f'intraday_market_cap_millions_{hhmm}'
     shares_col = 'share_class_shares_outstanding'
+    # Shares outstanding already in the file, looked up by symbol instead of filtering df per symbol
+    known_shares = df.drop_duplicates('symbol').set_index('symbol')[shares_col].to_dict() if shares_col in df.columns else {}
     # Fetch new data for each symbol (client, fallback to HTTP if needed)
     async def fetch_intraday(symbols, api_key, client):
         results = []
@@ -816,30 +1152,22 @@ def update_intraday_data_and_qualified(date_str, s3_bucket, hhmm, client):
                     volume = getattr(snapshot.day, 'v', None) if hasattr(snapshot, 'day') else None
                     open_ = getattr(snapshot.day, 'o', None) if hasattr(snapshot, 'day') else None
                     # Fetch shares outstanding if not present
-                    shares_out = None
-                    if shares_col in df.columns:
-                        shares_out = df.loc[df['symbol'] == symbol, shares_col].values[0]
-                        if pd.isna(shares_out) or shares_out == 'N/A':
-                            shares_out = None
+                    shares_out = known_shares.get(symbol)
+                    if pd.isna(shares_out) or shares_out == 'N/A':
+                        shares_out = None
                     if shares_out is None:
-                        # Fetch from company endpoint
-                        base_url = "https://api.polygon.io"
-                        company_url = f"{base_url}/v3/reference/tickers/{symbol}?apiKey={api_key}"
-                        async with session.get(company_url) as resp:
-                            data = await resp.json()
-                            if data.get('status') == 'OK' and data.get('results'):
-                                shares_out = data['results'].get('share_class_shares_outstanding')
+                        shares_out = await fetch_shares_outstanding(session, symbol, api_key)
                     if None in [price, volume, open_]:
                         # Fallback HTTP
                         base_url = "https://api.polygon.io"
                         trade_url = f"{base_url}/v2/last/trade/{symbol}?apiKey={api_key}"
                         prev_url = f"{base_url}/v2/aggs/ticker/{symbol}/prev?apiKey={api_key}"
                         async with session.get(trade_url) as resp:
-                            data = await resp.json()
+                            data = _loads(await resp.read())
                             if data.get('status') == 'OK' and data.get('results'):
                                 price = data['results'].get('p')
                         async with session.get(prev_url) as resp:
-                            data = await resp.json()
+                            data = _loads(await resp.read())
                             if data.get('status') == 'OK' and data.get('results'):
                                 open_ = data['results'][0].get('o')
                                 volume = data['results'][0].get('v')
@@ -858,10 +1186,9 @@ def update_intraday_data_and_qualified(date_str, s3_bucket, hhmm, client):
     # Add/fill shares outstanding column
     if shares_col not in df.columns:
         df[shares_col] = np.nan
-    for s in symbols:
-        shares_val = data_map.get(s, {}).get('shares_out')
-        if shares_val is not None:
-            df.loc[df['symbol'] == s, shares_col] = shares_val
+    fetched_shares = {s: row['shares_out'] for s, row in data_map.items() if row.get('shares_out') is not None}
+    fill_mask = df['symbol'].isin(fetched_shares.keys())
+    df.loc[fill_mask, shares_col] = df.loc[fill_mask, 'symbol'].map(fetched_shares)
     # Calculate intraday market cap in millions
     def calc_intraday_mcap(row):
         try:
@@ -874,31 +1201,9 @@ def update_intraday_data_and_qualified(date_str, s3_bucket, hhmm, client):
             return None
     df[mcap_col] = df.apply(calc_intraday_mcap, axis=1)
     # Calculate pct change from open for this time
-    def calc_pct(row):
-        open_ = row.get('open')
-        price = row.get(price_col)
-        if open_ and price and open_ != 0:
-            return ((price - open_) / open_) * 100
-        return None
-    df[pct_col] = df.apply(calc_pct, axis=1)
+    df[pct_col] = pct_change_from_open(df, price_col)
     # Update qualified column for this time
-    def is_qualified(row):
-        try:
-            vol = float(row.get(vol_col, 0) or 0)
-            close = float(row.get('close', 0) or 0)
-            open_ = float(row.get('open', 0) or 0)
-            curr = float(row.get(price_col, 0) or 0)
-            prev_close = float(row.get('close', 0) or 0)
-            return (
-                vol > 300_000 and
-                (curr - prev_close) / prev_close * 100 >= 2.5 if prev_close else False and
-                close >= 0.01 and
-                open_ > close
-            )
-        except Exception as e:
-            logger.error(f"Error qualifying row: {e}")
-            return False
-    df['qualified'] = df.apply(lambda row: f"[{hhmm}] - {'True' if is_qualified(row) else 'False'}", axis=1)
+    df['qualified'] = qualified_column(df, vol_col, price_col, hhmm)
     # Overwrite CSV
     df.to_csv(local_path, index=False)
     logger.info(f"Updated {filename} with intraday columns and qualified at {hhmm}.")
@@ -932,6 +1237,8 @@ def update_intraday_full_data_and_qualified(date_str, s3_bucket, hhmm, client):
     low_col = f'low_{hhmm}'
     mcap_col = f'intraday_market_cap_millions_{hhmm}'
     shares_col = 'share_class_shares_outstanding'
+    # Shares outstanding already in the file, looked up by symbol instead of filtering df per symbol
+    known_shares = df.drop_duplicates('symbol').set_index('symbol')[shares_col].to_dict() if shares_col in df.columns else {}
     # Fetch new data for each symbol (client, fallback to HTTP if needed)
     async def fetch_intraday_full(symbols, api_key, client):
         results = []
@@ -946,30 +1253,22 @@ def update_intraday_full_data_and_qualified(date_str, s3_bucket, hhmm, client):
                     high = getattr(snapshot.day, 'h', None) if hasattr(snapshot, 'day') else None
                     low = getattr(snapshot.day, 'l', None) if hasattr(snapshot, 'day') else None
                     # Fetch shares outstanding if not present
-                    shares_out = None
-                    if shares_col in df.columns:
-                        shares_out = df.loc[df['symbol'] == symbol, shares_col].values[0]
-                        if pd.isna(shares_out) or shares_out == 'N/A':
-                            shares_out = None
+                    shares_out = known_shares.get(symbol)
+                    if pd.isna(shares_out) or shares_out == 'N/A':
+                        shares_out = None
                     if shares_out is None:
-                        # Fetch from company endpoint
-                        base_url = "https://api.polygon.io"
-                        company_url = f"{base_url}/v3/reference/tickers/{symbol}?apiKey={api_key}"
-                        async with session.get(company_url) as resp:
-                            data = await resp.json()
-                            if data.get('status') == 'OK' and data.get('results'):
-                                shares_out = data['results'].get('share_class_shares_outstanding')
+                        shares_out = await fetch_shares_outstanding(session, symbol, api_key)
                     if None in [price, volume, open_, high, low]:
                         # Fallback HTTP
                         base_url = "https://api.polygon.io"
                         trade_url = f"{base_url}/v2/last/trade/{symbol}?apiKey={api_key}"
                         prev_url = f"{base_url}/v2/aggs/ticker/{symbol}/prev?apiKey={api_key}"
                         async with session.get(trade_url) as resp:
-                            data = await resp.json()
+                            data = _loads(await resp.read())
                             if data.get('status') == 'OK' and data.get('results'):
                                 price = data['results'].get('p')
                         async with session.get(prev_url) as resp:
-                            data = await resp.json()
+                            data = _loads(await resp.read())
                             if data.get('status') == 'OK' and data.get('results'):
                                 open_ = data['results'][0].get('o')
                                 volume = data['results'][0].get('v')
@@ -992,10 +1291,9 @@ def update_intraday_full_data_and_qualified(date_str, s3_bucket, hhmm, client):
     # Add/fill shares outstanding column
     if shares_col not in df.columns:
         df[shares_col] = np.nan
-    for s in symbols:
-        shares_val = data_map.get(s, {}).get('shares_out')
-        if shares_val is not None:
-            df.loc[df['symbol'] == s, shares_col] = shares_val
+    fetched_shares = {s: row['shares_out'] for s, row in data_map.items() if row.get('shares_out') is not None}
+    fill_mask = df['symbol'].isin(fetched_shares.keys())
+    df.loc[fill_mask, shares_col] = df.loc[fill_mask, 'symbol'].map(fetched_shares)
     # Calculate intraday market cap in millions
     def calc_intraday_mcap(row):
         try:
@@ -1008,31 +1306,9 @@ def update_intraday_full_data_and_qualified(date_str, s3_bucket, hhmm, client):
             return None
     df[mcap_col] = df.apply(calc_intraday_mcap, axis=1)
     # Calculate pct change from open for this time
-    def calc_pct(row):
-        open_ = row.get('open')
-        price = row.get(price_col)
-        if open_ and price and open_ != 0:
-            return ((price - open_) / open_) * 100
-        return None
-    df[pct_col] = df.apply(calc_pct, axis=1)
+    df[pct_col] = pct_change_from_open(df, price_col)
     # Update qualified column for this time
-    def is_qualified(row):
-        try:
-            vol = float(row.get(vol_col, 0) or 0)
-            close = float(row.get('close', 0) or 0)
-            open_ = float(row.get('open', 0) or 0)
-            curr = float(row.get(price_col, 0) or 0)
-            prev_close = float(row.get('close', 0) or 0)
-            return (
-                vol > 300_000 and
-                (curr - prev_close) / prev_close * 100 >= 2.5 if prev_close else False and
-                close >= 0.01 and
-                open_ > close
-            )
-        except Exception as e:
-            logger.error(f"Error qualifying row: {e}")
-            return False
-    df['qualified'] = df.apply(lambda row: f"[{hhmm}] - {'True' if is_qualified(row) else 'False'}", axis=1)
+    df['qualified'] = qualified_column(df, vol_col, price_col, hhmm)
     # Overwrite CSV
     df.to_csv(local_path, index=False)
     logger.info(f"Updated {filename} with intraday full columns and qualified at {hhmm}.")
@@ -1076,7 +1352,7 @@ def main():
     POLYGON_API_KEY = os.getenv('POLYGON_API_KEY')
     client = RESTClient(POLYGON_API_KEY)
     s3_bucket = S3_BUCKET
-    cst = pytz.timezone('America/Chicago')
+    cst = ZoneInfo('America/Chicago')
     date_str = datetime.now(cst).strftime('%Y%m%d')
     steps_run = set()
 
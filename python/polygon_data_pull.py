@@ -3,11 +3,12 @@
 import os
 import csv
 import requests
+from requests.adapters import HTTPAdapter
 import boto3
 from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import json
-import pytz
 
 # Add dotenv support for local development
 try:
@@ -16,16 +17,45 @@ try:
 except ImportError:
     pass  # If dotenv is not installed, skip (for AWS Lambda)
 
+# Use orjson for response bodies when it is packaged with the lambda
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Prev-day requests in flight at once; also sizes the connection pool
+FETCH_WORKERS = 8
+
+# Output layout; matches csv.writer's default dialect and the previous per-cell f-strings
+CSV_HEADER = 'ticker,open,close,volume\r\n'
+CSV_ROW_FORMAT = '%s,%.2f,%.2f,%d\r\n'
+
+# AWS clients by service name, created on first use and reused across warm invocations.
+# Nothing is cached when creation fails, so the next invocation retries it.
+_AWS_CLIENTS = {}
+
+def _aws_client(service, **kwargs):
+    """Return the boto3 client for service, creating it on first use"""
+    client = _AWS_CLIENTS.get(service)
+    if client is None:
+        client = _AWS_CLIENTS[service] = boto3.client(service, **kwargs)
+    return client
+
+# One session per container so keep-alive connections are reused across tickers and invocations
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=FETCH_WORKERS))
+
 def get_polygon_previous_day_data(symbol, api_key):
     """
     Get previous day's open, close, and volume data for a symbol using Polygon.io v2 aggregates endpoint
     """
     url = f"https://api.polygon.io/v2/aggs/ticker/{symbol}/prev"
     headers = {"Authorization": f"Bearer {api_key}"}
-    response = requests.get(url, headers=headers)
+    response = _SESSION.get(url, headers=headers)
     
     if response.status_code == 200:
-        data = response.json()
+        data = _loads(response.content)
         if data.get('status') == 'OK' and data.get('results'):
             result = data['results'][0]
             return {
@@ -50,10 +80,9 @@ def get_tickers_from_s3_screener(s3, bucket_name, screener_key):
     return [row['Symbol'] for row in reader if row.get('Symbol')]
 
 def lambda_handler(event, context):
-    s3 = boto3.client('s3')
-    sns = boto3.client('sns')
+    s3 = _aws_client('s3')
+    sns = _aws_client('sns')
     bucket_name = os.getenv('BUCKET_NAME')
-    lambda_client = boto3.client('lambda')
 
     POLYGON_API_KEY = os.getenv("POLYGON_API_KEY")
     input_date = event.get('override_date', datetime.now().strftime('%Y%m%d'))
@@ -76,32 +105,23 @@ def lambda_handler(event, context):
         valid_rows = []  # Store only rows with valid data
         invalid_tickers = []  # Store tickers with N/A values
         
-        for symbol in tickers:
-            row = {'ticker': symbol}
-            # Get previous day's data
-            prev_day_data = get_polygon_previous_day_data(symbol, POLYGON_API_KEY)
-            if prev_day_data:
-                row['open'] = f"{prev_day_data['open']:.2f}" if prev_day_data['open'] is not None else 'N/A'
-                row['close'] = f"{prev_day_data['close']:.2f}" if prev_day_data['close'] is not None else 'N/A'
-                row['volume'] = f"{int(prev_day_data['volume'])}" if prev_day_data['volume'] is not None else 'N/A'
-            else:
-                row['open'] = 'N/A'
-                row['close'] = 'N/A'
-                row['volume'] = 'N/A'
-            
-            # Check if any value is N/A
-            if 'N/A' not in [row['open'], row['close'], row['volume']]:
-                valid_rows.append(row)
-            else:
+        # Get previous day's data for all tickers concurrently
+        with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+            prev_day_results = list(executor.map(
+                lambda symbol: get_polygon_previous_day_data(symbol, POLYGON_API_KEY), tickers
+            ))
+
+        for symbol, prev_day_data in zip(tickers, prev_day_results):
+            # Rows with any missing value are reported as invalid instead of written
+            if prev_day_data is None or None in prev_day_data.values():
                 invalid_tickers.append(symbol)
+                continue
+            valid_rows.append((symbol, prev_day_data['open'], prev_day_data['close'], prev_day_data['volume']))
 
-        # Create CSV output for valid rows
+        # Create CSV output for valid rows, formatting each row with one template
         output = StringIO()
-        fieldnames = ['ticker', 'open', 'close', 'volume']
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        for row in valid_rows:
-            writer.writerow(row)
+        output.write(CSV_HEADER)
+        output.writelines(CSV_ROW_FORMAT % row for row in valid_rows)
 
         # Upload to S3
         s3.put_object(
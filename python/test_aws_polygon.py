@@ -0,0 +1,84 @@
+# test_aws_polygon.py - Tests for the screening Lambda's S3 helpers (run with pytest)
+import gzip
+import os
+import sys
+from io import BytesIO
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("numpy")
+pytest.importorskip("boto3")
+pytest.importorskip("polygon")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import aws_polygon
+
+
+class FakePaginator:
+    def __init__(self, keys):
+        self.keys = keys
+
+    def paginate(self, Bucket, Prefix):
+        # Two pages, keys deliberately out of order
+        contents = [{"Key": key} for key in self.keys if key.startswith(Prefix)]
+        yield {"Contents": contents[:1]}
+        yield {"Contents": contents[1:]}
+
+
+class FakeS3:
+    def __init__(self, objects):
+        self.objects = objects
+
+    def get_paginator(self, name):
+        assert name == "list_objects_v2"
+        return FakePaginator(list(self.objects))
+
+    def get_object(self, Bucket, Key):
+        return {"Body": BytesIO(self.objects[Key])}
+
+
+def csv_gz_bytes(df):
+    return gzip.compress(df.to_csv(index=False).encode())
+
+
+def parquet_bytes(df):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    buffer = BytesIO()
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), buffer)
+    return buffer.getvalue()
+
+
+def snapshot(symbol, hhmm):
+    return pd.DataFrame({"symbol": [symbol], "timestamp_cdt": [hhmm], "volume": [1_000_000.0]})
+
+
+def test_read_screening_results_sorts_and_concatenates_mixed_formats():
+    prefix = "stock_data/20250604/timepoint="
+    s3 = FakeS3({
+        f"{prefix}0915.parquet": parquet_bytes(snapshot("MSFT", "09:15")),
+        f"{prefix}0845.csv.gz": csv_gz_bytes(snapshot("AAPL", "08:45")),
+        f"{prefix}0900.parquet": parquet_bytes(snapshot("NVDA", "09:00")),
+        "stock_data/20250605/timepoint=0845.csv.gz": csv_gz_bytes(snapshot("TSLA", "08:45")),
+    })
+
+    result = aws_polygon.read_screening_results(s3, "bucket", "20250604")
+
+    assert result["symbol"].tolist() == ["AAPL", "NVDA", "MSFT"]
+    assert result["timestamp_cdt"].tolist() == ["08:45", "09:00", "09:15"]
+    assert result.index.tolist() == [0, 1, 2]
+
+
+def test_read_screening_results_empty_day():
+    assert aws_polygon.read_screening_results(FakeS3({}), "bucket", "20250604").empty
+
+
+def test_read_screening_results_parquet_without_pyarrow(monkeypatch):
+    monkeypatch.setattr(aws_polygon, "pq", None)
+    s3 = FakeS3({
+        "stock_data/20250604/timepoint=0845.csv.gz": csv_gz_bytes(snapshot("AAPL", "08:45")),
+        "stock_data/20250604/timepoint=0900.parquet": b"not read",
+    })
+    with pytest.raises(RuntimeError, match="pyarrow"):
+        aws_polygon.read_screening_results(s3, "bucket", "20250604")
@@ -0,0 +1,57 @@
+# test_jupyter_client.py - Tests for the vectorized qualification helpers in jupyter_client (run with pytest)
+import os
+import sys
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("numpy")
+pytest.importorskip("boto3")
+pytest.importorskip("aiohttp")
+pytest.importorskip("polygon")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jupyter_client import pct_change_from_open, qualified_column
+
+
+def baseline_is_qualified(row, vol_col, price_col):
+    """Row-wise qualification rule the vectorized column replaced."""
+    try:
+        vol = float(row.get(vol_col, 0) or 0)
+        close = float(row.get('close', 0) or 0)
+        open_ = float(row.get('open', 0) or 0)
+        curr = float(row.get(price_col, 0) or 0)
+        prev_close = float(row.get('close', 0) or 0)
+        return (vol > 300_000 and (curr - prev_close) / prev_close * 100 >= 2.5 if prev_close else False and close >= 0.01 and open_ > close)
+    except Exception:
+        return False
+
+
+def baseline_calc_pct(open_, price):
+    """Row-wise percent change from open the vectorized column replaced."""
+    if open_ and price and open_ != 0:
+        return ((price - open_) / open_) * 100
+    return None
+
+
+def qualification_frame():
+    # NaN, zero open, zero close, and values at exactly the 2.5% and 300,000 volume thresholds
+    nan = float('nan')
+    return pd.DataFrame({
+        'open':  [10.0, 0.0, 10.0, nan, 10.0, 10.0, 10.0, 10.0],
+        'close': [10.0, 10.0, 0.0, 10.0, 10.0, 10.0, nan, 100.0],
+        'vol':   [400_000, 400_000, 400_000, 400_000, 300_000, 300_001, 400_000, nan],
+        'price': [10.25, 11.0, 11.0, 11.0, 11.0, 10.25, 11.0, 102.5],
+    })
+
+
+def test_qualified_column_matches_rowwise_baseline():
+    df = qualification_frame()
+    expected = [f"[08:45] - {baseline_is_qualified(row, 'vol', 'price')}" for row in df.to_dict('records')]
+    assert list(qualified_column(df, 'vol', 'price', '08:45')) == expected
+
+
+def test_pct_change_from_open_matches_rowwise_baseline():
+    df = qualification_frame()
+    expected = pd.Series([baseline_calc_pct(o, p) for o, p in zip(df['open'], df['price'])], dtype=float)
+    pd.testing.assert_series_equal(pct_change_from_open(df, 'price'), expected, check_names=False)
@@ -4,6 +4,7 @@ import asyncio
 import aiohttp
 import logging
 import time
+import re
 from datetime import datetime
 import pytz
 from config import (
@@ -32,17 +33,19 @@ def ensure_filtered_data_exists(date_str, s3_bucket):
 
 def find_column_with_suffix(df, suffix):
     """Find column ending with specific suffix"""
-    matching_cols = [col for col in df.columns if col.endswith(suffix)]
-    return matching_cols[0] if matching_cols else None
+    return next((col for col in df.columns if col.endswith(suffix)), None)
+
+# Previous day columns end in _close, _open, _volume or _current_price; the group is the role
+_PREVIOUS_DAY_COLUMN_RE = re.compile(r'_(close|open|volume|current_price)$')
 
 def get_previous_day_columns(df):
-    """Get previous day column names from dataframe"""
-    return {
-        'close': find_column_with_suffix(df, '_close'),
-        'open': find_column_with_suffix(df, '_open'),
-        'volume': find_column_with_suffix(df, '_volume'),
-        'current_price': find_column_with_suffix(df, '_current_price')
-    }
+    """Get previous day column names from dataframe in a single pass over its columns"""
+    prev_cols = dict.fromkeys(('close', 'open', 'volume', 'current_price'))
+    for col in df.columns:
+        match = _PREVIOUS_DAY_COLUMN_RE.search(col)
+        if match and prev_cols[match.group(1)] is None:
+            prev_cols[match.group(1)] = col
+    return prev_cols
 
 async def fetch_current_price_only(session, symbol, api_key):
     """Fetch only current price for a symbol (optimized for momentum checks)"""
@@ -261,6 +261,45 @@ def test_utils_access():
         print(f"❌ Utils access test failed: {e}")
         return False
 
+def test_previous_day_columns():
+    """Test previous day column lookup with duplicate-role columns"""
+    print("📅 Testing previous day column lookup...")
+    
+    try:
+        import pandas as pd
+        import intraday_updates
+        import qualification_filter
+        
+        # Two columns per role; the first one in column order must win
+        df = pd.DataFrame(columns=[
+            'symbol', '20250102_close', 'prev_open', '20250101_close', 'volume',
+            'prev_volume', 'day_open', 'premarket_current_price', 'prev_current_price', 'prev_volume'
+        ])
+        expected = {
+            'close': '20250102_close',
+            'open': 'prev_open',
+            'volume': 'prev_volume',
+            'current_price': 'premarket_current_price'
+        }
+        
+        for module in (intraday_updates, qualification_filter):
+            prev_cols = module.get_previous_day_columns(df)
+            assert prev_cols == expected, f"{module.__name__}: {prev_cols}"
+            for role, col in prev_cols.items():
+                assert col == module.find_column_with_suffix(df, f"_{role}"), f"{module.__name__}: {role}"
+            print(f"✅ {module.__name__} picks the first column for each role")
+        
+        empty = intraday_updates.get_previous_day_columns(pd.DataFrame(columns=['symbol', 'volume']))
+        assert empty == dict.fromkeys(expected), f"Unexpected roles: {empty}"
+        print("✅ Missing roles stay None")
+        
+        print("🎉 Previous day column test passed!\n")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Previous day column test failed: {e}")
+        return False
+
 def run_comprehensive_test():
     """Run all tests"""
     print("🧪 COMPREHENSIVE MODULE TESTING")
@@ -274,6 +313,7 @@ def run_comprehensive_test():
         ("Fieldnames Consistency", test_fieldnames_consistency),
         ("Configuration Access", test_configuration_access),
         ("Utils Access", test_utils_access),
+        ("Previous Day Columns", test_previous_day_columns),
     ]
     
     passed = 0
@@ -0,0 +1,46 @@
+# test_check_git_safety.py - Tests for the git status parsing in check_git_safety (run with pytest)
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+if shutil.which("git") is None:
+    pytest.skip("git is not installed", allow_module_level=True)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import check_git_safety
+
+
+def git(*args):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        check=True, capture_output=True,
+    )
+
+
+def write(path, text=""):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def test_check_git_status_reports_staged_and_untracked_paths(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    git("init", "-q")
+    write("old_name.py", "print('hello')\n")
+    git("add", "old_name.py")
+    git("commit", "-q", "-m", "initial")
+
+    write(".env", "POLYGON_API_KEY=abc\n")
+    write("my notes.txt", "notes\n")
+    git("mv", "old_name.py", "new_name.py")
+    git("add", ".env", "my notes.txt")
+    write(os.path.join("data", "nested", "raw file.csv"), "a,b\n")
+
+    staged, untracked = check_git_safety.check_git_status()
+
+    assert sorted(staged) == [".env", "my notes.txt", "new_name.py"]
+    assert untracked == ["data/nested/raw file.csv"]
+    assert check_git_safety.list_present_files(staged + untracked) == set(staged + untracked)